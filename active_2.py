@@ -1,24 +1,481 @@
+import sys
+
+# A subcommand such as "report" runs headless instead of opening the window. This has to
+# come before the imports below, not in the __main__ block at the bottom: by then tkinter
+# is loaded, which fails on Pythons built without Tk and costs every cron or ssh run its
+# import time. tests/test_startup.py checks that the subcommands never load it.
+if __name__ == "__main__" and len(sys.argv) > 1:
+    from retirement_cli import main
+    sys.exit(main(sys.argv[1:]))
+
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import tkinter.font as tkfont
 from datetime import datetime
+from functools import lru_cache
+import queue
 import sqlite3
-import re
+import threading
+from retirement_schema import rebuild_income_rollup, find_income_rollup_mismatches
+from retirement_import import import_income_file
+from retirement_dates import day_from_display, format_day, format_days
+from retirement_money import cents_from_amount, format_cents, format_cents_grouped, parse_percentage, basis_points, apply_basis_points, remove_basis_points
+from retirement_journal import UnitOfWork, UndoConflict, undo_batch, redo_batch
+from retirement_export import export_to_file
+from retirement_engine import (
+    open_database, open_read_only, build_compare_query, fiscal_year_range, read_settings, read_total_profit, calculate_contribution,
+    calculate_contributions, summarize_contributions, EmployeeColumns,
+)
+
+# Display strings are cached, since every refresh formats the same names and amounts for
+# each row of each table. mask_name is also called from the database worker thread;
+# lru_cache is safe to share between threads.
+FORMAT_CACHE_SIZE = 8192
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def mask_name(name):
+    return ' '.join('*' * len(part) for part in name.split())
+
+def blur_name(name, privacy_mode):
+    return mask_name(name) if privacy_mode else name
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def format_currency(cents):
+    if cents < 0:
+        return f"(${format_cents_grouped(-cents)})"
+    return f"${format_cents_grouped(cents)}"
+
+class EmployeeDirectory:
+    # Employee ids and names shared by every employee combobox. Loaded on first use and
+    # reloaded only after invalidate(), which must be called whenever employees change.
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.employees = None
+        self.positions = {}
+        self.labels = {}
+
+    def invalidate(self):
+        self.employees = None
+        self.positions = {}
+        self.labels = {}
+
+    def get_employees(self):
+        if self.employees is None:
+            self.cursor.execute("SELECT employee_id, name FROM employees")
+            self.employees = self.cursor.fetchall()
+            self.positions = {employee_id: i for i, (employee_id, _) in enumerate(self.employees)}
+        return self.employees
+
+    def get_labels(self, privacy_mode):
+        # "id: name" strings as shown in the comboboxes, cached separately for blurred names
+        key = bool(privacy_mode)
+        if key not in self.labels:
+            self.labels[key] = [f"{id}: {mask_name(name) if key else name}" for id, name in self.get_employees()]
+        return self.labels[key]
+
+    def position(self, employee_id):
+        self.get_employees()
+        return self.positions.get(employee_id)
+
+class RefreshScheduler:
+    # Tracks which views are out of date. Mutations call invalidate(); dirty views on the
+    # visible notebook tab are refreshed together once Tk is idle, and the rest are
+    # refreshed when their tab is selected.
+    def __init__(self, root, notebook):
+        self.root = root
+        self.notebook = notebook
+        self.views = []  # (name, tab, refresh) in refresh order
+        self.dirty = set()
+        self.pending = None
+
+    def register(self, name, tab, refresh):
+        self.views.append((name, tab, refresh))
+        self.dirty.add(name)
+
+    def invalidate(self, *names):
+        self.dirty.update(names)
+        if self.pending is None:
+            self.pending = self.root.after_idle(self.flush)
+
+    def flush(self, event=None):
+        if self.pending is not None and event is not None:
+            self.root.after_cancel(self.pending)
+        self.pending = None
+        current = str(self.notebook.select())
+        for name, tab, refresh in self.views:
+            if name in self.dirty and str(tab) == current:
+                self.dirty.discard(name)
+                refresh()
+
+class DatabaseWorker:
+    # Runs read queries on a background thread with its own connection, so slow aggregates
+    # never block the Tk main loop. Requests are keyed by view: a newer request for the same
+    # key supersedes the older one, which is skipped, or interrupted if already running, and
+    # is never delivered. Results are handed back on the main thread by polling with after().
+    POLL_MS = 20
+
+    def __init__(self, root, connect, on_busy=None):
+        self.root = root
+        self.connect = connect  # called on the worker thread to open its connection
+        self.on_busy = on_busy
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.generations = {}  # key -> latest generation submitted
+        self.pending = 0
+        self.polling = None
+        self.lock = threading.Lock()
+        self.conn = None
+        self.running = None  # key of the request executing on the worker thread
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, key, load, deliver):
+        # load(cursor) runs on the worker thread and must not touch Tk; deliver(result) runs
+        # on the main thread
+        generation = self.generations.get(key, 0) + 1
+        self.generations[key] = generation
+        with self.lock:
+            if self.running == key:
+                self.conn.interrupt()
+        self.requests.put((key, generation, load, deliver))
+        self.set_pending(self.pending + 1)
+
+    def is_current(self, key, generation):
+        return self.generations.get(key) == generation
+
+    def set_pending(self, pending):
+        was_busy = self.pending > 0
+        self.pending = pending
+        if pending and self.polling is None:
+            self.polling = self.root.after(self.POLL_MS, self.poll)
+        if self.on_busy and was_busy != (pending > 0):
+            self.on_busy(pending > 0)
+
+    def run(self):
+        conn = self.connect()
+        cursor = conn.cursor()
+        with self.lock:
+            self.conn = conn
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            key, generation, load, deliver = request
+            result = error = None
+            while self.is_current(key, generation):
+                with self.lock:
+                    self.running = key
+                try:
+                    result = load(cursor)
+                    error = None
+                    break
+                except sqlite3.OperationalError as e:
+                    # An interrupt meant for a superseded request can land on this one; retry it
+                    if str(e) != "interrupted":
+                        error = e
+                        break
+                except Exception as e:
+                    error = e
+                    break
+                finally:
+                    with self.lock:
+                        self.running = None
+            self.results.put((key, generation, deliver, result, error))
+        conn.close()
+
+    def poll(self):
+        self.polling = None
+        while True:
+            try:
+                key, generation, deliver, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.set_pending(self.pending - 1)
+            if not self.is_current(key, generation):
+                continue
+            if error is not None:
+                messagebox.showerror("Error", f"Failed to load data: {str(error)}")
+            else:
+                deliver(result)
+        if self.pending and self.polling is None:
+            self.polling = self.root.after(self.POLL_MS, self.poll)
+
+    def close(self):
+        self.requests.put(None)
+
+class VirtualTreeview(ttk.Treeview):
+    # Treeview that only materializes the rows currently in view. set_rows() takes the full
+    # list of rows (first value is the row key); a small pool of items is reused as the
+    # window scrolls and only rows that changed are formatted and written back to Tk.
+    def __init__(self, master=None, rowheight=20, headingheight=24, formatter=None, **kw):
+        super().__init__(master, **kw)
+        self.formatter = formatter
+        self.rowheight = rowheight
+        self.headingheight = headingheight
+        self.rows = []
+        self.offset = 0
+        self.visible = int(kw.get("height", 10))
+        self.slots = []
+        self.slot_values = []
+        self.selection_keys = set()  # keys of selected rows, including those scrolled out of view
+        self.scrollbar = None
+        self.bind("<Configure>", self.on_configure)
+        # A plain click replaces the whole selection, so rows selected out of view are dropped;
+        # Control and Shift clicks extend it and keep them
+        self.bind("<Button-1>", self.on_click)
+        self.bind("<Control-Button-1>", lambda event: None)
+        self.bind("<Shift-Button-1>", lambda event: None)
+        self.bind("<MouseWheel>", self.on_mousewheel)
+        self.bind("<Button-4>", self.on_mousewheel)
+        self.bind("<Button-5>", self.on_mousewheel)
+        self.bind("<Up>", lambda event: self.on_arrow(-1))
+        self.bind("<Down>", lambda event: self.on_arrow(1))
+        self.bind("<Prior>", lambda event: self.on_page(-1))
+        self.bind("<Next>", lambda event: self.on_page(1))
+
+    def attach_scrollbar(self, scrollbar):
+        self.scrollbar = scrollbar
+        self.update_scrollbar()
+
+    def set_rows(self, rows):
+        self.remember_selection()
+        self.rows = rows
+        self.render()
+
+    def remember_selection(self):
+        # Selection state of rows in the window comes from Tk; rows outside it keep their state
+        selected = set(self.selection())
+        for slot, row in zip(self.slots, self.rows[self.offset:self.offset + len(self.slots)]):
+            if slot in selected:
+                self.selection_keys.add(row[0])
+            else:
+                self.selection_keys.discard(row[0])
+
+    def selected_keys(self):
+        # Keys of every selected row in row order, wherever the window is scrolled to
+        self.remember_selection()
+        if not self.selection_keys:
+            return []
+        return [row[0] for row in self.rows if row[0] in self.selection_keys]
+
+    def current_row(self):
+        # The focused row if it is selected, otherwise the first selected row; None when
+        # nothing is selected. Rows are returned as given to set_rows(), before formatting.
+        self.remember_selection()
+        focus = self.focus()
+        if focus in self.slots and focus in self.selection():
+            return self.rows[self.offset + self.slots.index(focus)]
+        return next((row for row in self.rows if row[0] in self.selection_keys), None)
+
+    def current_key(self):
+        row = self.current_row()
+        return None if row is None else row[0]
+
+    def current_values(self):
+        # The current row as displayed
+        row = self.current_row()
+        if row is None or self.formatter is None:
+            return row
+        return self.formatter(row)
+
+    def render(self):
+        self.offset = max(0, min(self.offset, len(self.rows) - self.visible))
+        window = self.rows[self.offset:self.offset + self.visible]
+        while len(self.slots) < len(window):
+            self.slots.append(self.insert("", tk.END, values=()))
+            self.slot_values.append(None)
+        while len(self.slots) > len(window):
+            self.delete(self.slots.pop())
+            self.slot_values.pop()
+        for i, row in enumerate(window):
+            if self.slot_values[i] != row:
+                self.item(self.slots[i], values=self.formatter(row) if self.formatter else row)
+                self.slot_values[i] = row
+        selected = tuple(slot for slot, row in zip(self.slots, window) if row[0] in self.selection_keys)
+        if selected != self.selection():
+            self.selection_set(selected)
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        if self.scrollbar is None:
+            return
+        if self.rows:
+            self.scrollbar.set(self.offset / len(self.rows), min(1.0, (self.offset + self.visible) / len(self.rows)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll_to(self, offset):
+        self.remember_selection()
+        self.offset = offset
+        self.render()
+
+    def yview(self, *args):
+        # Scrollbar protocol, applied to the virtual row offset instead of the Tk items
+        if not args:
+            if not self.rows:
+                return (0.0, 1.0)
+            return (self.offset / len(self.rows), min(1.0, (self.offset + self.visible) / len(self.rows)))
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * len(self.rows)))
+        elif args[0] == "scroll":
+            step = self.visible if args[2] == "pages" else 1
+            self.scroll_to(self.offset + int(args[1]) * step)
+
+    def on_configure(self, event):
+        visible = max(1, (event.height - self.headingheight) // self.rowheight)
+        if visible != self.visible:
+            self.remember_selection()
+            self.visible = visible
+            self.render()
+
+    def on_click(self, event):
+        self.selection_keys.clear()
+
+    def on_mousewheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.scroll_to(self.offset - 3)
+        else:
+            self.scroll_to(self.offset + 3)
+        return "break"
+
+    def on_arrow(self, step):
+        # Moving past the first or last materialized row scrolls the window instead
+        focus = self.focus()
+        if focus not in self.slots:
+            return None
+        index = self.slots.index(focus) + step
+        if 0 <= index < len(self.slots):
+            return None
+        self.scroll_to(self.offset + step)
+        edge = self.slots[0] if step < 0 else self.slots[-1]
+        self.selection_set(edge)
+        self.focus(edge)
+        return "break"
+
+    def on_page(self, step):
+        self.scroll_to(self.offset + step * self.visible)
+        return "break"
+
+class ColumnRows:
+    # Read-only sequence of row tuples over EmployeeColumns in a given order. Tuples are
+    # only built for the rows actually read, e.g. the visible window of a VirtualTreeview.
+    __slots__ = ("columns", "order")
+
+    def __init__(self, columns, order):
+        self.columns = columns
+        self.order = order
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.columns.row(i) for i in self.order[index]]
+        return self.columns.row(self.order[index])
+
+class TableModel:
+    # Sort state for one employee table over an EmployeeColumns store. Sorting keeps a
+    # cached ascending permutation per column, so flipping the direction of an already
+    # sorted column only reverses it.
+    TEXT_COLUMNS = (1, 2)
+
+    def __init__(self):
+        self.columns = EmployeeColumns()
+        self.permutations = {}
+        self.sort_column = None
+        self.descending = False
+
+    def set_columns(self, columns):
+        self.columns = columns
+        self.permutations = {}
+
+    def sort(self, column, descending):
+        self.sort_column = column
+        self.descending = descending
+
+    def get_permutation(self, column):
+        if column not in self.permutations:
+            values = self.columns.get_column(column)
+            if column in self.TEXT_COLUMNS:
+                key = lambda i: (values[i] or "").lower()
+            else:
+                key = values.__getitem__
+            self.permutations[column] = sorted(range(len(values)), key=key)
+        return self.permutations[column]
+
+    def ordered_rows(self, matches=None):
+        # Rows in display order, limited to the given employee ids when matches is not None
+        if self.sort_column is None:
+            order = range(len(self.columns))
+        else:
+            order = self.get_permutation(self.sort_column)
+            if self.descending:
+                order = order[::-1]
+        if matches is not None:
+            ids = self.columns.ids
+            order = [i for i in order if ids[i] in matches]
+        return ColumnRows(self.columns, order)
+
+class SearchIndex:
+    # Case-insensitive substring search over the name and department columns of a row list.
+    # Keys are lowercased once per rebuild, a query that extends the previous one only
+    # re-checks the previous matches, and other queries start from trigram posting sets.
+    # Postings are built the first time a trigram is needed, so a rebuild stays cheap.
+    # Results are sets of row keys (first column), so re-sorting the rows needs no rebuild.
+    def __init__(self, rows=()):
+        self.rebuild(rows)
+
+    def rebuild(self, rows):
+        # The newline keeps a query from matching across the two columns
+        self.keys = {row[0]: f"{row[1]}\n{row[2] or ''}".lower() for row in rows}
+        self.trigrams = {}
+        self.last_query = ""
+        self.last_matches = None
+
+    def trigram_postings(self, trigram):
+        postings = self.trigrams.get(trigram)
+        if postings is None:
+            postings = {row_key for row_key, text in self.keys.items() if trigram in text}
+            self.trigrams[trigram] = postings
+        return postings
+
+    def search(self, query):
+        # Returns None when every row matches
+        query = query.lower()
+        if not query:
+            matches = None
+        else:
+            if self.last_matches is not None and self.last_query and query.startswith(self.last_query):
+                candidates = self.last_matches
+            elif len(query) >= 3:
+                grams = {query[i:i + 3] for i in range(len(query) - 2)}
+                postings = [self.trigrams[gram] for gram in grams if gram in self.trigrams]
+                if not postings:
+                    postings = [self.trigram_postings(query[:3])]
+                postings.sort(key=len)
+                candidates = postings[0].intersection(*postings[1:])
+            else:
+                candidates = self.keys
+            matches = {row_key for row_key in candidates if query in self.keys[row_key]}
+        self.last_query = query
+        self.last_matches = matches
+        return matches
+
+SEARCH_DEBOUNCE_MS = 150
 
-try:
-    import PyPDF2
-except ImportError:
-    # Note: User needs to install PyPDF2 via pip install PyPDF2
-    pass
+EMPLOYEE_LIST_VIEWS = ("income_employees", "notes_employees", "attendance_employees", "compare_employees")
+INCOME_VIEWS = ("summary", "scenarios", "compare")
+DATABASE_PATH = "retirement.db"
 
 # Initialize the main application
 class RetirementTrackerApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Retirement Contribution Tracker")
-        self.conn = sqlite3.connect("retirement.db")
+        self.conn = open_database(DATABASE_PATH)
         self.cursor = self.conn.cursor()
-        self.setup_database()
+        self.db_worker = DatabaseWorker(self.root, lambda: open_read_only(DATABASE_PATH), self.set_busy)
+        self.employee_directory = EmployeeDirectory(self.cursor)
         self.contribution_percentage = self.get_contribution_percentage()
         self.selected_year = self.get_selected_year()
         self.privacy_mode = self.get_privacy_mode()
@@ -29,125 +486,36 @@ class RetirementTrackerApp:
         self.compare_label_font = tkfont.Font(family="Helvetica", size=14)
         self.total_label_font = tkfont.Font(family="Helvetica", size=14, weight="bold")
         self.tree_font = tkfont.Font(family="Helvetica", size=11)
+        self.tree_row_height = self.tree_font.metrics("linespace") + 6
+        self.tree_heading_height = self.label_font.metrics("linespace") + 8
         # Hypothetical data storage
-        self.hypothetical_data = {}  # Dictionary to store hypothetical values {employee_id: (income, contribution, eligible)}
-        self.summary_rows = []  # To store summary rows for filtering
-        self.actual_rows = []
-        self.hypothetical_rows = []
+        self.hypothetical_columns = None  # Hypothetical figures, kept across refreshes until settings change
+        self.summary_table = TableModel()  # Sort state and figures behind each employee table
+        self.actual_table = TableModel()
+        self.hypothetical_table = TableModel()
+        self.summary_search = SearchIndex()
+        self.actual_search = SearchIndex()
+        self.hypothetical_search = SearchIndex()
+        self.search_jobs = {}
         self.create_gui()
 
-    def setup_database(self):
-        # Create tables if they don't exist
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS employees (
-                employee_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                department TEXT,
-                eligible_for_retirement INTEGER DEFAULT 0
-            )
-        """)
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS income (
-                income_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employee_id INTEGER,
-                amount REAL,
-                date TEXT,
-                type TEXT,
-                FOREIGN KEY (employee_id) REFERENCES employees(employee_id)
-            )
-        """)
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS taxable_income (
-                year INTEGER PRIMARY KEY,
-                total_profit REAL
-            )
-        """)
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS settings (
-                setting_id INTEGER PRIMARY KEY,
-                contribution_percentage REAL,
-                selected_year INTEGER,
-                fiscal_year_start TEXT,
-                fiscal_year_end TEXT,
-                privacy_mode INTEGER
-            )
-        """)
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS notes (
-                note_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employee_id INTEGER,
-                note_text TEXT,
-                date TEXT,
-                FOREIGN KEY (employee_id) REFERENCES employees(employee_id)
-            )
-        """)
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS attendance (
-                attendance_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employee_id INTEGER,
-                date TEXT,
-                status TEXT,  -- 'Absent' or 'Tardy'
-                FOREIGN KEY (employee_id) REFERENCES employees(employee_id)
-            )
-        """)
-        # Check if columns exist and add them if not
-        self.cursor.execute("PRAGMA table_info(employees)")
-        columns = [col[1] for col in self.cursor.fetchall()]
-        if 'eligible_for_retirement' not in columns:
-            self.cursor.execute("ALTER TABLE employees ADD COLUMN eligible_for_retirement INTEGER DEFAULT 0")
-        
-        self.cursor.execute("PRAGMA table_info(settings)")
-        columns = [col[1] for col in self.cursor.fetchall()]
-        if 'selected_year' not in columns:
-            self.cursor.execute("ALTER TABLE settings ADD COLUMN selected_year INTEGER")
-            self.cursor.execute("UPDATE settings SET selected_year = ? WHERE setting_id = 1", (datetime.now().year,))
-        if 'privacy_mode' not in columns:
-            self.cursor.execute("ALTER TABLE settings ADD COLUMN privacy_mode INTEGER")
-            self.cursor.execute("UPDATE settings SET privacy_mode = 0 WHERE setting_id = 1")
-        # Insert default settings if not present
-        self.cursor.execute("SELECT COUNT(*) FROM settings")
-        if self.cursor.fetchone()[0] == 0:
-            default_year = datetime.now().year
-            self.cursor.execute(
-                "INSERT INTO settings (setting_id, contribution_percentage, selected_year, fiscal_year_start, fiscal_year_end, privacy_mode) VALUES (?, ?, ?, ?, ?, ?)",
-                (1, 5.0, default_year, f"{default_year}-03-01", f"{default_year + 1}-02-28", 0)
-            )
-        # Remove deductions table if it exists
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='deductions'")
-        if self.cursor.fetchone():
-            self.cursor.execute("DROP TABLE deductions")
-        self.conn.commit()
-
     def get_contribution_percentage(self):
-        self.cursor.execute("SELECT contribution_percentage FROM settings WHERE setting_id = 1")
-        result = self.cursor.fetchone()
-        return result[0] if result else 5.0
+        return read_settings(self.cursor)["contribution_percentage"]
 
     def get_selected_year(self):
-        self.cursor.execute("SELECT selected_year FROM settings WHERE setting_id = 1")
-        result = self.cursor.fetchone()
-        return result[0] if result else datetime.now().year
+        return read_settings(self.cursor)["selected_year"]
 
     def get_privacy_mode(self):
-        self.cursor.execute("SELECT privacy_mode FROM settings WHERE setting_id = 1")
-        result = self.cursor.fetchone()
-        return result[0] if result is not None else 0
+        return read_settings(self.cursor)["privacy_mode"]
 
     def get_total_profit(self):
-        self.cursor.execute("SELECT total_profit FROM taxable_income WHERE year = ?", (self.selected_year,))
-        result = self.cursor.fetchone()
-        return result[0] if result else 0.0
+        return read_total_profit(self.cursor, self.selected_year)
 
     def set_fiscal_year(self, year):
-        self.fiscal_year_start = f"{year}-03-01"
-        self.fiscal_year_end = f"{year + 1}-02-28"
+        self.fiscal_year_start, self.fiscal_year_end = fiscal_year_range(year)
 
     def blur_name(self, name):
-        if not self.privacy_mode:
-            return name
-        parts = name.split()
-        blurred_parts = [''.join('*' for _ in part) for part in parts]
-        return ' '.join(blurred_parts)
+        return blur_name(name, self.privacy_mode)
 
     def validate_date_range(self, start_date, end_date):
         try:
@@ -173,19 +541,74 @@ class RetirementTrackerApp:
         entry.bind("<FocusIn>", on_focusin)
         entry.bind("<FocusOut>", on_focusout)
 
-    def format_currency(self, value):
-        if value < 0:
-            return f"(${abs(value):,.2f})"
-        else:
-            return f"${value:,.2f}"
+    def format_currency(self, cents):
+        return format_currency(cents)
+
+    def format_employee_row(self, row):
+        employee_id, name, department, total_income, contribution, eligible = row
+        return (employee_id, name, department, format_currency(total_income), format_currency(contribution), "Yes" if eligible else "No")
 
     def create_gui(self):
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(pady=10, expand=True, fill='both')
+        self.status_label = ttk.Label(self.root, text="", font=self.label_font)
+        self.status_label.pack(side="bottom", fill='x', padx=10)
+
+        # Tabs stay empty frames until first selected; see build_current_tab
+        self.tab_builders = {}
+        self.employee_frame = self.add_tab("Manage Employees", self.build_employee_tab)
+        self.income_frame = self.add_tab("Log Income", self.build_income_tab)
+        self.notes_frame = self.add_tab("Log Notes", self.build_notes_tab)
+        self.attendance_frame = self.add_tab("Log Attendance", self.build_attendance_tab)
+        self.taxable_income_frame = self.add_tab("Taxable Income", self.build_taxable_income_tab)
+        self.summary_frame = self.add_tab("Summary", self.build_summary_tab)
+        self.scenarios_frame = self.add_tab("Scenarios", self.build_scenarios_tab)
+        self.compare_frame = self.add_tab("Compare", self.build_compare_tab)
+        self.settings_frame = self.add_tab("Settings", self.build_settings_tab)
+        self.root.bind_all("<Control-z>", lambda event: self.on_journal_shortcut(event, self.undo))
+        self.root.bind_all("<Control-y>", lambda event: self.on_journal_shortcut(event, self.redo))
 
-        # Employee Management Tab
-        self.employee_frame = ttk.Frame(self.notebook)
-        self.notebook.add(self.employee_frame, text="Manage Employees")
+        # Configure styles
+        style = ttk.Style()
+        style.configure("Big.TButton", font=self.button_font)
+        style.configure("Big.Treeview", font=self.tree_font, rowheight=self.tree_row_height)
+        style.configure("Big.Treeview.Heading", font=self.label_font)
+
+        # Views are filled in when their tab is first shown and refreshed only while visible
+        self.scheduler = RefreshScheduler(self.root, self.notebook)
+        self.scheduler.register("income_employees", self.income_frame, self.update_employee_combobox)
+        self.scheduler.register("notes_employees", self.notes_frame, self.update_notes_combobox)
+        self.scheduler.register("attendance_employees", self.attendance_frame, self.update_attendance_combobox)
+        self.scheduler.register("summary", self.summary_frame, self.refresh_summary)
+        self.scheduler.register("notes", self.summary_frame, self.update_notes_display)
+        self.scheduler.register("scenarios", self.scenarios_frame, self.refresh_scenarios)
+        self.scheduler.register("compare_employees", self.compare_frame, self.update_compare_comboboxes)
+        self.scheduler.register("compare", self.compare_frame, self.refresh_compare)
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        self.build_current_tab()
+        self.scheduler.invalidate()
+
+    def add_tab(self, text, build):
+        frame = ttk.Frame(self.notebook)
+        self.notebook.add(frame, text=text)
+        self.tab_builders[str(frame)] = build
+        return frame
+
+    def build_current_tab(self):
+        # A tab's widgets are created the first time it is shown, so startup only builds the
+        # first tab; the views on a tab are then loaded by the scheduler as before
+        build = self.tab_builders.pop(str(self.notebook.select()), None)
+        if build is not None:
+            build()
+
+    def is_tab_built(self, frame):
+        return str(frame) not in self.tab_builders
+
+    def on_tab_changed(self, event=None):
+        self.build_current_tab()
+        self.scheduler.flush(event)
+
+    def build_employee_tab(self):
         ttk.Label(self.employee_frame, text="Name:", font=self.label_font).grid(row=0, column=0, padx=5, pady=5)
         self.name_entry = ttk.Entry(self.employee_frame)
         self.name_entry.grid(row=0, column=1, padx=5, pady=5)
@@ -200,9 +623,7 @@ class RetirementTrackerApp:
         self.eligible_check.grid(row=2, column=1, padx=5, pady=5)
         ttk.Button(self.employee_frame, text="Add Employee", command=self.add_employee, style="Big.TButton").grid(row=3, column=0, columnspan=2, pady=10)
 
-        # Income Entry Tab
-        self.income_frame = ttk.Frame(self.notebook)
-        self.notebook.add(self.income_frame, text="Log Income")
+    def build_income_tab(self):
         ttk.Label(self.income_frame, text="Employee:", font=self.label_font).grid(row=0, column=0, padx=5, pady=5)
         self.employee_combobox = ttk.Combobox(self.income_frame)
         self.employee_combobox.grid(row=0, column=1, padx=5, pady=5)
@@ -220,10 +641,9 @@ class RetirementTrackerApp:
         self.type_combobox = ttk.Combobox(self.income_frame, values=["Salary", "Bonus"])
         self.type_combobox.grid(row=3, column=1, padx=5, pady=5)
         ttk.Button(self.income_frame, text="Add Income", command=self.add_income, style="Big.TButton").grid(row=4, column=0, columnspan=2, pady=10)
+        ttk.Button(self.income_frame, text="Import CSV", command=self.import_income_csv, style="Big.TButton").grid(row=5, column=0, columnspan=2, pady=10)
 
-        # Notes Entry Tab
-        self.notes_frame = ttk.Frame(self.notebook)
-        self.notebook.add(self.notes_frame, text="Log Notes")
+    def build_notes_tab(self):
         ttk.Label(self.notes_frame, text="Employee:", font=self.label_font).grid(row=0, column=0, padx=5, pady=5)
         self.notes_employee_combobox = ttk.Combobox(self.notes_frame)
         self.notes_employee_combobox.grid(row=0, column=1, padx=5, pady=5)
@@ -239,9 +659,7 @@ class RetirementTrackerApp:
         ttk.Button(self.notes_frame, text="Today", command=self.set_note_today_date, style="Big.TButton").grid(row=2, column=2, padx=5, pady=5)
         ttk.Button(self.notes_frame, text="Add Note", command=self.add_note, style="Big.TButton").grid(row=3, column=0, columnspan=2, pady=10)
 
-        # Attendance Entry Tab
-        self.attendance_frame = ttk.Frame(self.notebook)
-        self.notebook.add(self.attendance_frame, text="Log Attendance")
+    def build_attendance_tab(self):
         ttk.Label(self.attendance_frame, text="Employee:", font=self.label_font).grid(row=0, column=0, padx=5, pady=5)
         self.attendance_employee_combobox = ttk.Combobox(self.attendance_frame)
         self.attendance_employee_combobox.grid(row=0, column=1, padx=5, pady=5)
@@ -256,9 +674,7 @@ class RetirementTrackerApp:
         self.status_combobox.grid(row=2, column=1, padx=5, pady=5)
         ttk.Button(self.attendance_frame, text="Add Attendance", command=self.add_attendance, style="Big.TButton").grid(row=3, column=0, columnspan=2, pady=10)
 
-        # Taxable Income Tab
-        self.taxable_income_frame = ttk.Frame(self.notebook)
-        self.notebook.add(self.taxable_income_frame, text="Taxable Income")
+    def build_taxable_income_tab(self):
         self.income_statement_frame = ttk.Frame(self.taxable_income_frame)
         self.income_statement_frame.pack(pady=10, fill='both', expand=True)
         self.revenue_entry = self.create_income_statement_entry("Revenue", 0)
@@ -287,9 +703,7 @@ class RetirementTrackerApp:
         self.add_placeholder(self.total_profit_entry, "0.00")
         ttk.Button(self.taxable_income_frame, text="Update Total Profit", command=self.update_total_profit, style="Big.TButton").pack(pady=5)
 
-        # Summary Tab
-        self.summary_frame = ttk.Frame(self.notebook)
-        self.notebook.add(self.summary_frame, text="Summary")
+    def build_summary_tab(self):
         self.left_frame = ttk.Frame(self.summary_frame)
         self.left_frame.grid(row=0, column=0, sticky="ns", padx=10, pady=10)
         self.right_frame = ttk.Frame(self.summary_frame)
@@ -320,6 +734,9 @@ class RetirementTrackerApp:
         ttk.Button(self.left_frame, text="View Notes", command=self.view_employee_notes, style="Big.TButton").pack(pady=5, fill='x')
         ttk.Button(self.left_frame, text="View Attendance", command=self.view_employee_attendance, style="Big.TButton").pack(pady=5, fill='x')
         ttk.Button(self.left_frame, text="Toggle Retirement Eligibility", command=self.toggle_eligibility, style="Big.TButton").pack(pady=5, fill='x')
+        ttk.Button(self.left_frame, text="Export", command=self.open_export_window, style="Big.TButton").pack(pady=5, fill='x')
+        ttk.Button(self.left_frame, text="Undo", command=self.undo, style="Big.TButton").pack(pady=5, fill='x')
+        ttk.Button(self.left_frame, text="Redo", command=self.redo, style="Big.TButton").pack(pady=5, fill='x')
         # Search in Summary
         search_frame = ttk.Frame(self.right_frame)
         search_frame.pack(pady=5, fill='x')
@@ -327,7 +744,7 @@ class RetirementTrackerApp:
         self.summary_search_entry = ttk.Entry(search_frame)
         self.summary_search_entry.pack(side="left", fill='x', expand=True)
         self.summary_search_entry.bind("<KeyRelease>", self.filter_summary)
-        self.tree = ttk.Treeview(self.right_frame, columns=("ID", "Name", "Department", "Total Income", "Contribution", "Eligible"), show="headings", style="Big.Treeview")
+        self.tree = self.create_virtual_tree(self.right_frame, ("ID", "Name", "Department", "Total Income", "Contribution", "Eligible"), self.format_employee_row)
         self.tree.heading("ID", text="ID", command=lambda: self.sort_summary("ID", False))
         self.tree.heading("Name", text="Name", command=lambda: self.sort_summary("Name", False))
         self.tree.heading("Department", text="Department", command=lambda: self.sort_summary("Department", False))
@@ -336,7 +753,6 @@ class RetirementTrackerApp:
         self.tree.heading("Eligible", text="Retirement Eligible", command=lambda: self.sort_summary("Eligible", False))
         self.tree.column("Total Income", anchor='e')
         self.tree.column("Contribution", anchor='e')
-        self.tree.pack(pady=10, fill='both', expand=True)
         self.total_income_label = ttk.Label(self.right_frame, text=f"Fiscal Year {self.selected_year} Total Income: $0.00", font=self.total_label_font, anchor="w")
         self.total_income_label.pack(pady=10, fill='x')
         self.total_contribution_label = ttk.Label(self.right_frame, text=f"Fiscal Year {self.selected_year} Total Contribution: $0.00", font=self.total_label_font, anchor="w")
@@ -351,9 +767,7 @@ class RetirementTrackerApp:
         self.notes_text.pack(pady=10, fill='both', expand=True)
         self.notes_text.config(state='disabled')
 
-        # Scenarios Tab
-        self.scenarios_frame = ttk.Frame(self.notebook)
-        self.notebook.add(self.scenarios_frame, text="Scenarios")
+    def build_scenarios_tab(self):
         self.scenarios_left_frame = ttk.Frame(self.scenarios_frame)
         self.scenarios_left_frame.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
         self.scenarios_right_frame = ttk.Frame(self.scenarios_frame)
@@ -384,7 +798,7 @@ class RetirementTrackerApp:
         self.actual_search_entry = ttk.Entry(actual_search_frame)
         self.actual_search_entry.pack(side="left", fill='x', expand=True)
         self.actual_search_entry.bind("<KeyRelease>", self.filter_actual)
-        self.actual_tree = ttk.Treeview(self.scenarios_left_frame, columns=("ID", "Name", "Department", "Total Income", "Contribution", "Eligible"), show="headings", style="Big.Treeview")
+        self.actual_tree = self.create_virtual_tree(self.scenarios_left_frame, ("ID", "Name", "Department", "Total Income", "Contribution", "Eligible"), self.format_employee_row)
         self.actual_tree.heading("ID", text="ID", command=lambda: self.sort_actual("ID", False))
         self.actual_tree.heading("Name", text="Name", command=lambda: self.sort_actual("Name", False))
         self.actual_tree.heading("Department", text="Department", command=lambda: self.sort_actual("Department", False))
@@ -393,7 +807,6 @@ class RetirementTrackerApp:
         self.actual_tree.heading("Eligible", text="Eligible", command=lambda: self.sort_actual("Eligible", False))
         self.actual_tree.column("Total Income", anchor='e')
         self.actual_tree.column("Contribution", anchor='e')
-        self.actual_tree.pack(pady=10, fill='both', expand=True)
         # Hypothetical Summary Table
         ttk.Label(self.scenarios_right_frame, text="Hypothetical Summary", font=self.total_label_font).pack(pady=5)
         hypothetical_search_frame = ttk.Frame(self.scenarios_right_frame)
@@ -402,7 +815,7 @@ class RetirementTrackerApp:
         self.hypothetical_search_entry = ttk.Entry(hypothetical_search_frame)
         self.hypothetical_search_entry.pack(side="left", fill='x', expand=True)
         self.hypothetical_search_entry.bind("<KeyRelease>", self.filter_hypothetical)
-        self.hypothetical_tree = ttk.Treeview(self.scenarios_right_frame, columns=("ID", "Name", "Department", "Total Income", "Contribution", "Eligible"), show="headings", style="Big.Treeview")
+        self.hypothetical_tree = self.create_virtual_tree(self.scenarios_right_frame, ("ID", "Name", "Department", "Total Income", "Contribution", "Eligible"), self.format_employee_row)
         self.hypothetical_tree.heading("ID", text="ID", command=lambda: self.sort_hypothetical("ID", False))
         self.hypothetical_tree.heading("Name", text="Name", command=lambda: self.sort_hypothetical("Name", False))
         self.hypothetical_tree.heading("Department", text="Department", command=lambda: self.sort_hypothetical("Department", False))
@@ -411,7 +824,6 @@ class RetirementTrackerApp:
         self.hypothetical_tree.heading("Eligible", text="Eligible", command=lambda: self.sort_hypothetical("Eligible", False))
         self.hypothetical_tree.column("Total Income", anchor='e')
         self.hypothetical_tree.column("Contribution", anchor='e')
-        self.hypothetical_tree.pack(pady=10, fill='both', expand=True)
         # Differences Text
         self.differences_text = tk.Text(self.scenarios_frame, height=10, font=self.label_font)
         self.differences_text.grid(row=2, column=0, columnspan=2, pady=10, padx=10, sticky="nsew")
@@ -421,35 +833,21 @@ class RetirementTrackerApp:
         # Bind double-click for editing hypothetical table
         self.hypothetical_tree.bind("<Double-1>", self.edit_hypothetical)
 
-        # Compare Tab
-        self.compare_frame = ttk.Frame(self.notebook)
-        self.notebook.add(self.compare_frame, text="Compare")
-        self.compare_left_frame = ttk.Frame(self.compare_frame)
-        self.compare_left_frame.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
-        self.compare_right_frame = ttk.Frame(self.compare_frame)
-        self.compare_right_frame.grid(row=0, column=1, sticky="nsew", padx=10, pady=10)
+    def build_compare_tab(self):
+        # One column per compared employee; slots can be added and removed
+        self.compare_slots_frame = ttk.Frame(self.compare_frame)
+        self.compare_slots_frame.grid(row=0, column=0, columnspan=2, sticky="nsew")
         self.compare_frame.grid_columnconfigure(0, weight=1)
         self.compare_frame.grid_columnconfigure(1, weight=1)
         self.compare_frame.grid_rowconfigure(0, weight=1)
-        # Employee 1 selection
-        ttk.Label(self.compare_left_frame, text="Employee 1:", font=self.label_font).pack(pady=5)
-        self.employee1_combobox = ttk.Combobox(self.compare_left_frame)
-        self.employee1_combobox.pack(pady=5, fill='x')
-        # Employee 2 selection
-        ttk.Label(self.compare_right_frame, text="Employee 2:", font=self.label_font).pack(pady=5)
-        self.employee2_combobox = ttk.Combobox(self.compare_right_frame)
-        self.employee2_combobox.pack(pady=5, fill='x')
-        # Labels for comparison
-        self.employee1_info = ttk.Label(self.compare_left_frame, text="Select an employee", font=self.compare_label_font, anchor="center")
-        self.employee1_info.pack(pady=10, fill='x')
-        self.employee2_info = ttk.Label(self.compare_right_frame, text="Select an employee", font=self.compare_label_font, anchor="center")
-        self.employee2_info.pack(pady=10, fill='x')
-        # Refresh button
-        ttk.Button(self.compare_frame, text="Refresh Comparison", command=self.refresh_compare, style="Big.TButton").grid(row=1, column=0, columnspan=2, pady=10)
-
-        # Settings Tab
-        self.settings_frame = ttk.Frame(self.notebook)
-        self.notebook.add(self.settings_frame, text="Settings")
+        self.compare_slots = []  # [(frame, combobox, info label)]
+        self.add_compare_slot()
+        self.add_compare_slot()
+        # Add and refresh buttons
+        ttk.Button(self.compare_frame, text="Add Employee", command=self.add_compare_employee, style="Big.TButton").grid(row=1, column=0, pady=10)
+        ttk.Button(self.compare_frame, text="Refresh Comparison", command=self.refresh_compare, style="Big.TButton").grid(row=1, column=1, pady=10)
+
+    def build_settings_tab(self):
         ttk.Label(self.settings_frame, text="Contribution Percentage:", font=self.label_font).grid(row=0, column=0, padx=5, pady=5)
         self.percentage_entry = ttk.Entry(self.settings_frame, justify='right')
         self.percentage_entry.insert(0, str(self.contribution_percentage))
@@ -463,19 +861,18 @@ class RetirementTrackerApp:
         self.privacy_check = ttk.Checkbutton(self.settings_frame, text="Blur Employee Names", variable=self.privacy_var)
         self.privacy_check.grid(row=2, column=1, padx=5, pady=5)
         ttk.Button(self.settings_frame, text="Update Settings", command=self.update_settings, style="Big.TButton").grid(row=3, column=0, columnspan=2, pady=10)
-
-        # Configure styles
-        style = ttk.Style()
-        style.configure("Big.TButton", font=self.button_font)
-        style.configure("Big.Treeview", font=self.tree_font)
-        style.configure("Big.Treeview.Heading", font=self.label_font)
-
-        # Initialize comboboxes after all tabs are created
-        self.update_employee_combobox()
-        self.update_notes_combobox()
-        self.update_attendance_combobox()
-        self.update_compare_comboboxes()
-        self.refresh_summary()
+        ttk.Button(self.settings_frame, text="Check Income Rollup", command=self.verify_income_rollup, style="Big.TButton").grid(row=4, column=0, pady=10)
+        ttk.Button(self.settings_frame, text="Rebuild Income Rollup", command=self.repair_income_rollup, style="Big.TButton").grid(row=4, column=1, pady=10)
+
+    def create_virtual_tree(self, parent, columns, formatter=None):
+        tree_frame = ttk.Frame(parent)
+        tree_frame.pack(pady=10, fill='both', expand=True)
+        tree = VirtualTreeview(tree_frame, rowheight=self.tree_row_height, headingheight=self.tree_heading_height, formatter=formatter, columns=columns, show="headings", style="Big.Treeview")
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+        scrollbar.pack(side="right", fill='y')
+        tree.pack(side="left", fill='both', expand=True)
+        tree.attach_scrollbar(scrollbar)
+        return tree
 
     def set_today_date(self):
         today = datetime.now().strftime("%m-%d-%Y")
@@ -518,36 +915,65 @@ class RetirementTrackerApp:
         self.refresh_scenarios()
 
     def update_employee_combobox(self):
-        self.cursor.execute("SELECT employee_id, name FROM employees")
-        employees = [(row[0], row[1]) for row in self.cursor.fetchall()]
-        self.employee_combobox["values"] = [f"{id}: {self.blur_name(name)}" for id, name in employees]
-        if employees:
+        employee_values = self.employee_directory.get_labels(self.privacy_mode)
+        self.employee_combobox["values"] = employee_values
+        if employee_values:
             self.employee_combobox.current(0)
 
     def update_notes_combobox(self):
-        self.cursor.execute("SELECT employee_id, name FROM employees")
-        employees = [(row[0], row[1]) for row in self.cursor.fetchall()]
-        self.notes_employee_combobox["values"] = [f"{id}: {self.blur_name(name)}" for id, name in employees]
-        if employees:
+        employee_values = self.employee_directory.get_labels(self.privacy_mode)
+        self.notes_employee_combobox["values"] = employee_values
+        if employee_values:
             self.notes_employee_combobox.current(0)
 
     def update_attendance_combobox(self):
-        self.cursor.execute("SELECT employee_id, name FROM employees")
-        employees = [(row[0], row[1]) for row in self.cursor.fetchall()]
-        self.attendance_employee_combobox["values"] = [f"{id}: {self.blur_name(name)}" for id, name in employees]
-        if employees:
+        employee_values = self.employee_directory.get_labels(self.privacy_mode)
+        self.attendance_employee_combobox["values"] = employee_values
+        if employee_values:
             self.attendance_employee_combobox.current(0)
 
     def update_compare_comboboxes(self):
-        self.cursor.execute("SELECT employee_id, name FROM employees")
-        employees = [(row[0], row[1]) for row in self.cursor.fetchall()]
-        employee_values = [f"{id}: {self.blur_name(name)}" for id, name in employees]
-        self.employee1_combobox["values"] = employee_values
-        self.employee2_combobox["values"] = employee_values
-        if employees:
-            self.employee1_combobox.current(0) if len(employees) > 0 else None
-            self.employee2_combobox.current(1 if len(employees) > 1 else 0) if employee_values else None
-        self.refresh_compare()
+        employee_values = self.employee_directory.get_labels(self.privacy_mode)
+        for index, (_, combobox, _) in enumerate(self.compare_slots):
+            combobox["values"] = employee_values
+            if employee_values:
+                combobox.current(min(index, len(employee_values) - 1))
+
+    def add_compare_slot(self):
+        frame = ttk.Frame(self.compare_slots_frame)
+        ttk.Label(frame, text=f"Employee {len(self.compare_slots) + 1}:", font=self.label_font).pack(pady=5)
+        combobox = ttk.Combobox(frame)
+        combobox.pack(pady=5, fill='x')
+        info = ttk.Label(frame, text="Select an employee", font=self.compare_label_font, anchor="center")
+        info.pack(pady=10, fill='x')
+        slot = (frame, combobox, info)
+        ttk.Button(frame, text="Remove", command=lambda: self.remove_compare_employee(slot)).pack(pady=5)
+        self.compare_slots.append(slot)
+        self.layout_compare_slots()
+        return slot
+
+    def layout_compare_slots(self):
+        for column, (frame, _, _) in enumerate(self.compare_slots):
+            frame.grid(row=0, column=column, sticky="nsew", padx=10, pady=10)
+            self.compare_slots_frame.grid_columnconfigure(column, weight=1)
+        self.compare_slots_frame.grid_rowconfigure(0, weight=1)
+
+    def add_compare_employee(self):
+        _, combobox, _ = self.add_compare_slot()
+        employee_values = self.employee_directory.get_labels(self.privacy_mode)
+        combobox["values"] = employee_values
+        if employee_values:
+            combobox.current(min(len(self.compare_slots) - 1, len(employee_values) - 1))
+        self.scheduler.invalidate("compare")
+
+    def remove_compare_employee(self, slot):
+        if len(self.compare_slots) <= 2:
+            messagebox.showerror("Error", "At least two employees are needed for a comparison")
+            return
+        self.compare_slots.remove(slot)
+        slot[0].destroy()
+        self.compare_slots_frame.grid_columnconfigure(len(self.compare_slots), weight=0)
+        self.layout_compare_slots()
 
     def add_employee(self):
         name = self.name_entry.get()
@@ -558,19 +984,18 @@ class RetirementTrackerApp:
         if not name:
             messagebox.showerror("Error", "Name is required")
             return
-        self.cursor.execute("INSERT INTO employees (name, department, eligible_for_retirement) VALUES (?, ?, ?)", 
-                          (name, department, eligible))
-        self.conn.commit()
+        try:
+            with UnitOfWork(self.conn, f"Add employee {name}") as work:
+                work.insert("employees", {"name": name, "department": department, "eligible_for_retirement": eligible})
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"Failed to add employee: {e}")
+            return
+        self.employee_directory.invalidate()
         self.name_entry.delete(0, tk.END)
         self.add_placeholder(self.name_entry, "John Doe")
         self.dept_combobox.set("")
         self.eligible_var.set(0)
-        self.update_employee_combobox()
-        self.update_notes_combobox()
-        self.update_attendance_combobox()
-        self.update_compare_comboboxes()
-        self.refresh_summary()
-        self.refresh_scenarios()
+        self.scheduler.invalidate(*EMPLOYEE_LIST_VIEWS, *INCOME_VIEWS)
         messagebox.showinfo("Success", "Employee added")
 
     def add_income(self):
@@ -583,7 +1008,7 @@ class RetirementTrackerApp:
             amount_str = self.amount_entry.get()
             if amount_str == "0.00":
                 raise ValueError("Amount must be positive")
-            amount = float(amount_str)
+            amount = cents_from_amount(amount_str)
             if amount <= 0:
                 raise ValueError("Amount must be positive")
             date = self.date_entry.get()
@@ -593,26 +1018,43 @@ class RetirementTrackerApp:
             if not amount or not date or not type_:
                 messagebox.showerror("Error", "All fields are required")
                 return
-            parsed_date = datetime.strptime(date, "%m-%d-%Y")
-            db_date = parsed_date.strftime("%Y-%m-%d")
+            db_date = day_from_display(date)
         except ValueError as e:
             messagebox.showerror("Error", str(e) or "Invalid amount or date format (use MM-DD-YYYY)")
             return
-        self.cursor.execute(
-            "INSERT INTO income (employee_id, amount, date, type) VALUES (?, ?, ?, ?)",
-            (employee_id, amount, db_date, type_)
-        )
-        self.conn.commit()
+        try:
+            with UnitOfWork(self.conn, "Add income") as work:
+                work.insert("income", {"employee_id": employee_id, "amount": amount, "date": db_date, "type": type_})
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"Failed to add income: {e}")
+            return
         self.amount_entry.delete(0, tk.END)
         self.add_placeholder(self.amount_entry, "0.00")
         self.date_entry.delete(0, tk.END)
         self.add_placeholder(self.date_entry, "MM-DD-YYYY")
         self.type_combobox.set("")
-        self.refresh_summary()
-        self.refresh_scenarios()
-        self.refresh_compare()
+        self.scheduler.invalidate(*INCOME_VIEWS)
         messagebox.showinfo("Success", "Income added")
 
+    def import_income_csv(self):
+        file_path = filedialog.askopenfilename(filetypes=[("CSV/TSV files", "*.csv *.tsv *.txt"), ("All files", "*.*")])
+        if not file_path:
+            return
+        rejects_path = f"{file_path}.rejects.csv"
+        try:
+            # One undo step for the whole file, so undoing an earlier batch never cascades
+            # over imported rows it knows nothing about
+            with UnitOfWork(self.conn, "Import income") as work:
+                imported, rejected = import_income_file(self.conn, file_path, rejects_path, work=work)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            messagebox.showerror("Error", f"Failed to import income: {str(e)}")
+            return
+        self.scheduler.invalidate(*INCOME_VIEWS)
+        if rejected:
+            messagebox.showwarning("Import", f"Imported {imported} income records. {rejected} rows were rejected; see {rejects_path}")
+        else:
+            messagebox.showinfo("Success", f"Imported {imported} income records")
+
     def add_note(self):
         employee_str = self.notes_employee_combobox.get()
         if not employee_str:
@@ -629,22 +1071,21 @@ class RetirementTrackerApp:
             messagebox.showerror("Error", "Note and date are required")
             return
         try:
-            parsed_date = datetime.strptime(date, "%m-%d-%Y")
-            db_date = parsed_date.strftime("%Y-%m-%d")
+            db_date = day_from_display(date)
         except ValueError:
             messagebox.showerror("Error", "Invalid date format (use MM-DD-YYYY)")
             return
-        self.cursor.execute(
-            "INSERT INTO notes (employee_id, note_text, date) VALUES (?, ?, ?)",
-            (employee_id, note_text, db_date)
-        )
-        self.conn.commit()
+        try:
+            with UnitOfWork(self.conn, "Add note") as work:
+                work.insert("notes", {"employee_id": employee_id, "note_text": note_text, "date": db_date})
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"Failed to add note: {e}")
+            return
         self.note_entry.delete(0, tk.END)
         self.add_placeholder(self.note_entry, "Enter note here")
         self.note_date_entry.delete(0, tk.END)
         self.add_placeholder(self.note_date_entry, "MM-DD-YYYY")
-        self.update_notes_display()
-        self.refresh_summary()
+        self.scheduler.invalidate("notes")
         messagebox.showinfo("Success", "Note added")
 
     def add_attendance(self):
@@ -661,88 +1102,87 @@ class RetirementTrackerApp:
             messagebox.showerror("Error", "Date and status are required")
             return
         try:
-            parsed_date = datetime.strptime(date, "%m-%d-%Y")
-            db_date = parsed_date.strftime("%Y-%m-%d")
+            db_date = day_from_display(date)
         except ValueError:
             messagebox.showerror("Error", "Invalid date format (use MM-DD-YYYY)")
             return
-        self.cursor.execute(
-            "INSERT INTO attendance (employee_id, date, status) VALUES (?, ?, ?)",
-            (employee_id, db_date, status)
-        )
-        self.conn.commit()
+        try:
+            with UnitOfWork(self.conn, "Add attendance record") as work:
+                work.insert("attendance", {"employee_id": employee_id, "date": db_date, "status": status})
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"Failed to add attendance record: {e}")
+            return
         self.attendance_date_entry.delete(0, tk.END)
         self.add_placeholder(self.attendance_date_entry, "MM-DD-YYYY")
         self.status_combobox.set("")
-        self.refresh_compare()
+        self.scheduler.invalidate("compare")
         messagebox.showinfo("Success", "Attendance record added")
 
+    def show_total_profit(self):
+        # The entry is on the Taxable Income tab, which may not have been built yet
+        if not self.is_tab_built(self.taxable_income_frame):
+            return
+        self.total_profit_entry.delete(0, tk.END)
+        self.total_profit_entry.insert(0, format_cents(self.get_total_profit()))
+
     def update_total_profit(self):
         try:
             total_profit_str = self.total_profit_entry.get()
-            if total_profit_str == "0.00":
-                total_profit = 0.0
-            else:
-                total_profit = float(total_profit_str)
+            total_profit = cents_from_amount(total_profit_str)
             if total_profit < 0:
                 raise ValueError
         except ValueError:
             messagebox.showerror("Error", "Invalid profit amount (must be a non-negative number)")
             return
-        self.cursor.execute("SELECT COUNT(*) FROM taxable_income WHERE year = ?", (self.selected_year,))
-        if self.cursor.fetchone()[0] > 0:
-            self.cursor.execute("UPDATE taxable_income SET total_profit = ? WHERE year = ?", (total_profit, self.selected_year))
-        else:
-            self.cursor.execute("INSERT INTO taxable_income (year, total_profit) VALUES (?, ?)", (self.selected_year, total_profit))
-        self.conn.commit()
-        self.refresh_summary()
+        try:
+            with UnitOfWork(self.conn, f"Update total profit for {self.selected_year}") as work:
+                if not work.update("taxable_income", self.selected_year, {"total_profit": total_profit}):
+                    work.insert("taxable_income", {"year": self.selected_year, "total_profit": total_profit})
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"Failed to update total profit: {e}")
+            return
+        self.scheduler.invalidate("summary")
         messagebox.showinfo("Success", "Total profit updated")
 
     def toggle_eligibility(self):
-        selected_item = self.tree.selection()
-        if not selected_item:
+        employee_id = self.tree.current_key()
+        if employee_id is None:
             messagebox.showerror("Error", "Select an employee to toggle eligibility")
             return
-        employee_id = self.tree.item(selected_item)["values"][0]
         self.cursor.execute("SELECT eligible_for_retirement FROM employees WHERE employee_id = ?", (employee_id,))
         current_status = self.cursor.fetchone()[0]
         new_status = 1 if current_status == 0 else 0
-        self.cursor.execute("UPDATE employees SET eligible_for_retirement = ? WHERE employee_id = ?", (new_status, employee_id))
-        self.conn.commit()
-        self.refresh_summary()
-        self.refresh_scenarios()
-        self.refresh_compare()
+        try:
+            with UnitOfWork(self.conn, "Toggle retirement eligibility") as work:
+                work.update("employees", employee_id, {"eligible_for_retirement": new_status})
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"Failed to update eligibility: {e}")
+            return
+        self.scheduler.invalidate(*INCOME_VIEWS)
         messagebox.showinfo("Success", f"Retirement eligibility {'enabled' if new_status else 'disabled'}")
 
     def sort_summary(self, col, descending):
-        # Sort the summary_rows
-        def get_key(row):
-            val = row[self.tree['columns'].index(col)]
-            if col in ["Total Income", "Contribution"]:
-                val = val.replace(",", "").replace("$", "").replace("(", "-").replace(")", "")
-                return float(val)
-            elif col == "ID":
-                return int(val)
-            else:
-                return val.lower()
-        self.summary_rows.sort(key=get_key, reverse=descending)
+        self.summary_table.sort(self.tree['columns'].index(col), descending)
         self.display_summary_rows()
         # Update heading command to reverse sort
         self.tree.heading(col, command=lambda: self.sort_summary(col, not descending))
 
+    def schedule_search(self, name, display):
+        # Debounce typing in a search box so only the last keystroke of a burst filters
+        pending = self.search_jobs.get(name)
+        if pending is not None:
+            self.root.after_cancel(pending)
+        self.search_jobs[name] = self.root.after(SEARCH_DEBOUNCE_MS, display)
+
     def filter_summary(self, event=None):
-        self.display_summary_rows()
+        self.schedule_search("summary", self.display_summary_rows)
 
     def display_summary_rows(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        query = self.summary_search_entry.get().lower()
-        for row in self.summary_rows:
-            if query in row[1].lower() or query in row[2].lower():
-                self.tree.insert("", tk.END, values=row)
+        matches = self.summary_search.search(self.summary_search_entry.get())
+        self.tree.set_rows(self.summary_table.ordered_rows(matches))
 
-    def refresh_summary(self):
-        total_profit = self.get_total_profit()
+    def get_summary_range(self):
+        # (start_db, end_db, period_label) for the Summary tab's date range, or None if it is invalid
         start_date = self.summary_start_date.get()
         if start_date == "MM-DD-YYYY":
             start_date = ""
@@ -753,52 +1193,111 @@ class RetirementTrackerApp:
             valid, result = self.validate_date_range(start_date, end_date)
             if not valid:
                 messagebox.showerror("Error", result)
-                return
+                return None
             start_db, end_db = result
-            period_label = f"{start_date} to {end_date}"
-        else:
-            start_db, end_db = self.fiscal_year_start, self.fiscal_year_end
-            period_label = f"Fiscal Year {self.selected_year}"
-        self.cursor.execute("""
-            SELECT e.employee_id, e.name, e.department, COALESCE(SUM(i.amount), 0) as total_income, e.eligible_for_retirement
-            FROM employees e
-            LEFT JOIN income i ON e.employee_id = i.employee_id
-            WHERE i.date BETWEEN ? AND ? OR i.date IS NULL
-            GROUP BY e.employee_id
-        """, (start_db, end_db))
-        total_income = 0
-        total_contribution = 0
-        rows = self.cursor.fetchall()
-        self.summary_rows = []
-        for row in rows:
-            contribution = row[3] * (self.contribution_percentage / 100) if row[4] else 0
-            blurred_name = self.blur_name(row[1])
-            eligible_status = "Yes" if row[4] else "No"
-            self.summary_rows.append((row[0], blurred_name, row[2], self.format_currency(row[3]), self.format_currency(contribution), eligible_status))
-            total_income += row[3]
-            if row[4]:
-                total_contribution += contribution
-        total_spend = total_income + total_contribution - total_profit
+            return start_db, end_db, f"{start_date} to {end_date}"
+        return self.fiscal_year_start, self.fiscal_year_end, f"Fiscal Year {self.selected_year}"
+
+    def set_busy(self, busy):
+        self.status_label.config(text="Loading..." if busy else "")
+        self.root.config(cursor="watch" if busy else "")
+
+    def submit_employee_columns(self, key, start_db, end_db, deliver, load_extra=None):
+        # Loads EmployeeColumns for the range on the database worker; load_extra(cursor), when
+        # given, runs in the same request and its result is passed to deliver as well
+        contribution_percentage, selected_year = self.contribution_percentage, self.selected_year
+        format_name = mask_name if self.privacy_mode else None
+        def load(cursor):
+            columns = calculate_contributions(cursor, start_db, end_db, contribution_percentage, selected_year, format_name=format_name)
+            return columns, load_extra(cursor) if load_extra else None
+        self.db_worker.submit(key, load, lambda result: deliver(*result))
+
+    def refresh_summary(self):
+        summary_range = self.get_summary_range()
+        if summary_range is None:
+            return
+        start_db, end_db, period_label = summary_range
+        selected_year = self.selected_year
+        self.submit_employee_columns("summary", start_db, end_db, lambda columns, total_profit: self.show_summary(period_label, columns, total_profit),
+                                     lambda cursor: read_total_profit(cursor, selected_year))
+
+    def show_summary(self, period_label, columns, total_profit):
+        total_income, total_contribution, total_spend = summarize_contributions(columns, total_profit)
         self.total_income_label.config(text=f"{period_label} Total Income: {self.format_currency(total_income)}")
         self.total_contribution_label.config(text=f"{period_label} Total Contribution: {self.format_currency(total_contribution)}")
         self.total_taxable_income_label.config(text=f"{period_label} Total Taxable Income: {self.format_currency(total_profit)}")
         self.total_spend_label.config(text=f"{period_label} Total Spend: {self.format_currency(total_spend)}")
+        self.summary_table.set_columns(columns)
+        self.summary_search.rebuild(zip(columns.ids, columns.names, columns.departments))
         self.display_summary_rows()
         # Update notes display when an employee is selected
         self.tree.bind('<<TreeviewSelect>>', self.update_notes_display)
 
+    def open_export_window(self):
+        export_window = tk.Toplevel(self.root)
+        export_window.title("Export")
+        ttk.Label(export_window, text="Data:", font=self.label_font).grid(row=0, column=0, padx=5, pady=5)
+        table_combobox = ttk.Combobox(export_window, values=["Summary", "Income", "Attendance", "Notes"], state="readonly")
+        table_combobox.set("Summary")
+        table_combobox.grid(row=0, column=1, padx=5, pady=5)
+        ttk.Label(export_window, text="Format:", font=self.label_font).grid(row=1, column=0, padx=5, pady=5)
+        format_combobox = ttk.Combobox(export_window, values=["CSV", "Columnar"], state="readonly")
+        format_combobox.set("CSV")
+        format_combobox.grid(row=1, column=1, padx=5, pady=5)
+        selected_only_var = tk.IntVar(value=0)
+        ttk.Checkbutton(export_window, text="Selected employees only", variable=selected_only_var).grid(row=2, column=0, columnspan=2, padx=5, pady=5)
+        ttk.Label(export_window, text="Uses the Summary date range", font=self.label_font).grid(row=3, column=0, columnspan=2, padx=5, pady=5)
+
+        def run_export():
+            summary_range = self.get_summary_range()
+            if summary_range is None:
+                return
+            start_db, end_db, _ = summary_range
+            employee_ids = None
+            if selected_only_var.get():
+                employee_ids = self.tree.selected_keys()
+                if not employee_ids:
+                    messagebox.showerror("Error", "Select an employee in the Summary table")
+                    return
+            name = table_combobox.get().lower()
+            export_format = format_combobox.get().lower()
+            extension = ".rtcol" if export_format == "columnar" else ".csv"
+            file_path = filedialog.asksaveasfilename(defaultextension=extension, initialfile=f"{name}{extension}",
+                                                     filetypes=[("Columnar files", "*.rtcol")] if export_format == "columnar" else [("CSV files", "*.csv")])
+            if not file_path:
+                return
+            contribution_percentage, selected_year = self.contribution_percentage, self.selected_year
+            # Written from the worker's read-only connection so a large export does not freeze
+            # the window; database errors are reported by the worker
+            def load(cursor):
+                try:
+                    return export_to_file(cursor, name, file_path, export_format, start_db, end_db, employee_ids,
+                                          contribution_percentage, selected_year), None
+                except OSError as e:
+                    return None, e
+            def deliver(result):
+                count, error = result
+                if error is not None:
+                    messagebox.showerror("Error", f"Failed to export: {str(error)}")
+                    return
+                messagebox.showinfo("Success", f"Exported {count} rows")
+                if export_window.winfo_exists():
+                    export_window.destroy()
+            # Keyed by file, so exporting to the same file again supersedes a running export
+            self.db_worker.submit(f"export {file_path}", load, deliver)
+
+        ttk.Button(export_window, text="Export", command=run_export, style="Big.TButton").grid(row=4, column=0, columnspan=2, pady=10)
+
     def update_notes_display(self, event=None):
         self.notes_text.config(state='normal')
         self.notes_text.delete(1.0, tk.END)
-        selected_item = self.tree.selection()
-        if selected_item:
-            employee_id = self.tree.item(selected_item)["values"][0]
+        employee_id = self.tree.current_key()
+        if employee_id is not None:
             self.cursor.execute("SELECT date, note_text FROM notes WHERE employee_id = ? ORDER BY date DESC", (employee_id,))
             notes = self.cursor.fetchall()
             if notes:
                 for date, note_text in notes:
-                    display_date = datetime.strptime(date, "%Y-%m-%d").strftime("%m-%d-%Y")
-                    self.notes_text.insert(tk.END, f"{display_date}: {note_text}\n\n")
+                    self.notes_text.insert(tk.END, f"{format_day(date)}: {note_text}\n\n")
             else:
                 self.notes_text.insert(tk.END, "No notes available for this employee.")
         else:
@@ -806,111 +1305,88 @@ class RetirementTrackerApp:
         self.notes_text.config(state='disabled')
 
     def sort_actual(self, col, descending):
-        def get_key(row):
-            val = row[self.actual_tree['columns'].index(col)]
-            if col in ["Total Income", "Contribution"]:
-                val = val.replace(",", "").replace("$", "").replace("(", "-").replace(")", "")
-                return float(val)
-            elif col == "ID":
-                return int(val)
-            else:
-                return val.lower()
-        self.actual_rows.sort(key=get_key, reverse=descending)
+        self.actual_table.sort(self.actual_tree['columns'].index(col), descending)
         self.display_actual_rows()
         self.actual_tree.heading(col, command=lambda: self.sort_actual(col, not descending))
 
     def filter_actual(self, event=None):
-        self.display_actual_rows()
+        self.schedule_search("actual", self.display_actual_rows)
 
     def display_actual_rows(self):
-        for item in self.actual_tree.get_children():
-            self.actual_tree.delete(item)
-        query = self.actual_search_entry.get().lower()
-        for row in self.actual_rows:
-            if query in row[1].lower() or query in row[2].lower():
-                self.actual_tree.insert("", tk.END, values=row)
+        matches = self.actual_search.search(self.actual_search_entry.get())
+        self.actual_tree.set_rows(self.actual_table.ordered_rows(matches))
 
     def sort_hypothetical(self, col, descending):
-        def get_key(row):
-            val = row[self.hypothetical_tree['columns'].index(col)]
-            if col in ["Total Income", "Contribution"]:
-                val = val.replace(",", "").replace("$", "").replace("(", "-").replace(")", "")
-                return float(val)
-            elif col == "ID":
-                return int(val)
-            else:
-                return val.lower()
-        self.hypothetical_rows.sort(key=get_key, reverse=descending)
+        self.hypothetical_table.sort(self.hypothetical_tree['columns'].index(col), descending)
         self.display_hypothetical_rows()
         self.hypothetical_tree.heading(col, command=lambda: self.sort_hypothetical(col, not descending))
 
     def filter_hypothetical(self, event=None):
-        self.display_hypothetical_rows()
+        self.schedule_search("hypothetical", self.display_hypothetical_rows)
 
     def display_hypothetical_rows(self):
-        for item in self.hypothetical_tree.get_children():
-            self.hypothetical_tree.delete(item)
-        query = self.hypothetical_search_entry.get().lower()
-        for row in self.hypothetical_rows:
-            if query in row[1].lower() or query in row[2].lower():
-                self.hypothetical_tree.insert("", tk.END, values=row)
+        matches = self.hypothetical_search.search(self.hypothetical_search_entry.get())
+        self.hypothetical_tree.set_rows(self.hypothetical_table.ordered_rows(matches))
 
     def edit_hypothetical(self, event):
-        selected_item = self.hypothetical_tree.selection()
-        if not selected_item:
+        values = self.hypothetical_tree.current_values()
+        if values is None:
             return
-        item = self.hypothetical_tree.item(selected_item)
-        employee_id = item["values"][0]
+        employee_id = values[0]
         column = self.hypothetical_tree.identify_column(event.x)
         col_index = int(column.replace("#", "")) - 1
         if col_index not in [3, 4, 5]:  # Only allow editing Total Income, Contribution, Eligible
             return
+        if self.hypothetical_columns is None:
+            messagebox.showerror("Error", "The scenario is out of date; set a valid date range to reload it")
+            return
         edit_window = tk.Toplevel(self.root)
         edit_window.title("Edit Hypothetical Data")
         edit_window.geometry("300x150")
         ttk.Label(edit_window, text="New Value:", font=self.label_font).grid(row=0, column=0, padx=5, pady=5)
         if col_index == 5:  # Eligible column
-            eligible_var = tk.StringVar(value=item["values"][col_index])
+            eligible_var = tk.StringVar(value=values[col_index])
             ttk.Radiobutton(edit_window, text="Yes", value="Yes", variable=eligible_var).grid(row=0, column=1, padx=5, pady=5)
             ttk.Radiobutton(edit_window, text="No", value="No", variable=eligible_var).grid(row=1, column=1, padx=5, pady=5)
         else:
             entry = ttk.Entry(edit_window, justify='right')
             entry.grid(row=0, column=1, padx=5, pady=5)
-            entry.insert(0, item["values"][col_index].replace("$", "").replace(",", "").replace("(", "").replace(")", ""))
+            entry.insert(0, values[col_index].replace("$", "").replace(",", "").replace("(", "").replace(")", ""))
         def save_edit():
+            # The scenario may have been reloaded or reset while the dialog was open
+            hypothetical = self.hypothetical_columns
+            position = None if hypothetical is None else hypothetical.positions.get(employee_id)
+            if position is None:
+                messagebox.showerror("Error", "This employee is no longer in the scenario; reopen the editor")
+                edit_window.destroy()
+                return
             try:
+                points = basis_points(self.contribution_percentage)
                 if col_index == 3:  # Total Income
-                    new_value = float(entry.get())
+                    new_value = cents_from_amount(entry.get())
                     if new_value < 0:
                         raise ValueError
-                    eligible = self.hypothetical_data.get(employee_id, (0, 0, False))[2]
-                    contribution = new_value * (self.contribution_percentage / 100) if eligible else self.hypothetical_data.get(employee_id, (0, 0, False))[1]
-                    self.hypothetical_data[employee_id] = (new_value, contribution, eligible)
+                    hypothetical.income[position] = new_value
+                    if hypothetical.eligible[position]:
+                        hypothetical.contribution[position] = apply_basis_points(new_value, points)
                 elif col_index == 4:  # Contribution
-                    new_value = float(entry.get())
+                    new_value = cents_from_amount(entry.get())
                     if new_value < 0:
                         raise ValueError
-                    eligible = self.hypothetical_data.get(employee_id, (0, 0, False))[2]
-                    income = new_value / (self.contribution_percentage / 100) if eligible and self.contribution_percentage != 0 else self.hypothetical_data.get(employee_id, (0, 0, False))[0]
-                    self.hypothetical_data[employee_id] = (income, new_value, eligible)
+                    hypothetical.contribution[position] = new_value
+                    if hypothetical.eligible[position] and points > 0:
+                        hypothetical.income[position] = remove_basis_points(new_value, points)
                 elif col_index == 5:  # Eligible
                     new_value = eligible_var.get() == "Yes"
-                    income = self.hypothetical_data.get(employee_id, (0, 0, False))[0]
-                    contribution = income * (self.contribution_percentage / 100) if new_value else 0
-                    self.hypothetical_data[employee_id] = (income, contribution, new_value)
-                self.refresh_scenarios()
+                    hypothetical.eligible[position] = 1 if new_value else 0
+                    hypothetical.contribution[position] = calculate_contribution(hypothetical.income[position], self.contribution_percentage, new_value)
+                self.scheduler.invalidate("scenarios")
                 edit_window.destroy()
             except ValueError:
                 messagebox.showerror("Error", "Invalid input (must be a non-negative number for income/contribution)")
         ttk.Button(edit_window, text="Save", command=save_edit, style="Big.TButton").grid(row=2, column=0, columnspan=2, pady=10)
 
     def refresh_scenarios(self):
-        # Clear tables
-        for item in self.actual_tree.get_children():
-            self.actual_tree.delete(item)
-        for item in self.hypothetical_tree.get_children():
-            self.hypothetical_tree.delete(item)
-        self.differences_text.delete(1.0, tk.END)
         # Determine date range
         start_date = self.scenarios_start_date.get()
         if start_date == "MM-DD-YYYY":
@@ -928,52 +1404,39 @@ class RetirementTrackerApp:
         else:
             start_db, end_db = self.fiscal_year_start, self.fiscal_year_end
             period_label = f"Fiscal Year {self.selected_year}"
-        # Populate actual table
-        self.cursor.execute("""
-            SELECT e.employee_id, e.name, e.department, COALESCE(SUM(i.amount), 0) as total_income, e.eligible_for_retirement
-            FROM employees e
-            LEFT JOIN income i ON e.employee_id = i.employee_id
-            WHERE i.date BETWEEN ? AND ? OR i.date IS NULL
-            GROUP BY e.employee_id
-        """, (start_db, end_db))
-        actual_data = {}
-        differences = []
-        self.actual_rows = []
-        for row in self.cursor.fetchall():
-            employee_id, name, department, total_income, eligible = row
-            contribution = total_income * (self.contribution_percentage / 100) if eligible else 0
-            actual_data[employee_id] = (total_income, contribution, eligible)
-            blurred_name = self.blur_name(name)
-            eligible_status = "Yes" if eligible else "No"
-            self.actual_rows.append((employee_id, blurred_name, department, self.format_currency(total_income), self.format_currency(contribution), eligible_status))
-            # Initialize hypothetical data if not already set
-            if employee_id not in self.hypothetical_data:
-                self.hypothetical_data[employee_id] = (total_income, contribution, bool(eligible))
+        self.submit_employee_columns("scenarios", start_db, end_db, lambda actual, _: self.show_scenarios(period_label, actual))
+
+    def show_scenarios(self, period_label, actual):
+        # The hypothetical figures start from the actual ones; edits made earlier are carried over
+        previous = self.hypothetical_columns
+        hypothetical = actual.copy_figures()
+        if previous is not None:
+            for i, employee_id in enumerate(actual.ids):
+                j = previous.positions.get(employee_id)
+                if j is not None:
+                    hypothetical.income[i] = previous.income[j]
+                    hypothetical.contribution[i] = previous.contribution[j]
+                    hypothetical.eligible[i] = previous.eligible[j]
+        self.hypothetical_columns = hypothetical
+        self.actual_table.set_columns(actual)
+        self.actual_search.rebuild(zip(actual.ids, actual.names, actual.departments))
         self.display_actual_rows()
-        # Populate hypothetical table
-        self.hypothetical_rows = []
-        for employee_id, (total_income, contribution, eligible) in self.hypothetical_data.items():
-            self.cursor.execute("SELECT name, department FROM employees WHERE employee_id = ?", (employee_id,))
-            result = self.cursor.fetchone()
-            if result:
-                name, department = result
-                blurred_name = self.blur_name(name)
-                eligible_status = "Yes" if eligible else "No"
-                self.hypothetical_rows.append((employee_id, blurred_name, department, self.format_currency(total_income), self.format_currency(contribution), eligible_status))
+        self.hypothetical_table.set_columns(hypothetical)
+        self.hypothetical_search.rebuild(zip(actual.ids, actual.names, actual.departments))
         self.display_hypothetical_rows()
+        self.differences_text.delete(1.0, tk.END)
         # Calculate differences
-        for employee_id, (hyp_income, hyp_contribution, hyp_eligible) in self.hypothetical_data.items():
-            if employee_id in actual_data:
-                act_income, act_contribution, act_eligible = actual_data[employee_id]
-                self.cursor.execute("SELECT name FROM employees WHERE employee_id = ?", (employee_id,))
-                name = self.cursor.fetchone()[0]
-                blurred_name = self.blur_name(name)
-                if hyp_income != act_income:
-                    differences.append(f"{blurred_name}: Change Total Income from {self.format_currency(act_income)} to {self.format_currency(hyp_income)}")
-                if hyp_contribution != act_contribution:
-                    differences.append(f"{blurred_name}: Change Contribution from {self.format_currency(act_contribution)} to {self.format_currency(hyp_contribution)}")
-                if hyp_eligible != act_eligible:
-                    differences.append(f"{blurred_name}: Change Retirement Eligibility from {'Yes' if act_eligible else 'No'} to {'Yes' if hyp_eligible else 'No'}")
+        differences = []
+        for i, blurred_name in enumerate(actual.names):
+            act_income, hyp_income = actual.income[i], hypothetical.income[i]
+            act_contribution, hyp_contribution = actual.contribution[i], hypothetical.contribution[i]
+            act_eligible, hyp_eligible = actual.eligible[i], hypothetical.eligible[i]
+            if hyp_income != act_income:
+                differences.append(f"{blurred_name}: Change Total Income from {self.format_currency(act_income)} to {self.format_currency(hyp_income)}")
+            if hyp_contribution != act_contribution:
+                differences.append(f"{blurred_name}: Change Contribution from {self.format_currency(act_contribution)} to {self.format_currency(hyp_contribution)}")
+            if hyp_eligible != act_eligible:
+                differences.append(f"{blurred_name}: Change Retirement Eligibility from {'Yes' if act_eligible else 'No'} to {'Yes' if hyp_eligible else 'No'}")
         # Display differences
         if differences:
             self.differences_text.insert(tk.END, f"Changes needed to achieve hypothetical scenario for {period_label}:\n" + "\n".join(differences))
@@ -981,90 +1444,75 @@ class RetirementTrackerApp:
             self.differences_text.insert(tk.END, f"No differences between actual and hypothetical scenarios for {period_label}.")
 
     def refresh_compare(self):
-        employee1_str = self.employee1_combobox.get()
-        employee2_str = self.employee2_combobox.get()
-        
-        def get_employee_info(employee_str):
-            if not employee_str:
-                return "Select an employee", 0, 0, False, "", 0, 0
+        selected = []
+        for _, combobox, _ in self.compare_slots:
             try:
-                employee_id = int(employee_str.split(":")[0])
-                self.cursor.execute("""
-                    SELECT e.name, COALESCE(SUM(i.amount), 0), e.eligible_for_retirement, e.department
-                    FROM employees e
-                    LEFT JOIN income i ON e.employee_id = i.employee_id
-                    WHERE e.employee_id = ? AND (i.date BETWEEN ? AND ? OR i.date IS NULL)
-                    GROUP BY e.employee_id
-                """, (employee_id, self.fiscal_year_start, self.fiscal_year_end))
-                result = self.cursor.fetchone()
-                # Count absences and tardies
-                self.cursor.execute("""
-                    SELECT COUNT(*) FROM attendance 
-                    WHERE employee_id = ? AND status = 'Absent' AND date BETWEEN ? AND ?
-                """, (employee_id, self.fiscal_year_start, self.fiscal_year_end))
-                absences = self.cursor.fetchone()[0]
-                self.cursor.execute("""
-                    SELECT COUNT(*) FROM attendance 
-                    WHERE employee_id = ? AND status = 'Tardy' AND date BETWEEN ? AND ?
-                """, (employee_id, self.fiscal_year_start, self.fiscal_year_end))
-                tardies = self.cursor.fetchone()[0]
-                if result:
-                    name, total_income, eligible, department = result
-                    contribution = total_income * (self.contribution_percentage / 100) if eligible else 0
-                    return name, total_income, contribution, eligible, department, absences, tardies
-                return "Employee not found", 0, 0, False, "", 0, 0
-            except:
-                return "Select an employee", 0, 0, False, "", 0, 0
-
-        name1, income1, contrib1, eligible1, dept1, absences1, tardies1 = get_employee_info(employee1_str)
-        name2, income2, contrib2, eligible2, dept2, absences2, tardies2 = get_employee_info(employee2_str)
-        
-        self.employee1_info.config(text=f"Name: {self.blur_name(name1)}\n"
-                                      f"Department: {dept1}\n"
-                                      f"Total Income: {self.format_currency(income1)}\n"
-                                      f"Contribution: {self.format_currency(contrib1)}\n"
-                                      f"Eligible: {'Yes' if eligible1 else 'No'}\n"
-                                      f"Absences: {absences1}\n"
-                                      f"Tardies: {tardies1}",
-                                 font=self.compare_label_font)
-        self.employee2_info.config(text=f"Name: {self.blur_name(name2)}\n"
-                                      f"Department: {dept2}\n"
-                                      f"Total Income: {self.format_currency(income2)}\n"
-                                      f"Contribution: {self.format_currency(contrib2)}\n"
-                                      f"Eligible: {'Yes' if eligible2 else 'No'}\n"
-                                      f"Absences: {absences2}\n"
-                                      f"Tardies: {tardies2}",
-                                 font=self.compare_label_font)
+                selected.append(int(combobox.get().split(":")[0]))
+            except ValueError:
+                selected.append(None)
+        # One query covers every compared employee, however many slots there are
+        employee_ids = sorted({employee_id for employee_id in selected if employee_id is not None})
+        query, params = build_compare_query(self.fiscal_year_start, self.fiscal_year_end, employee_ids, self.selected_year)
+        def load(cursor):
+            if not employee_ids:
+                return {}
+            cursor.execute(query, params)
+            return {row[0]: row for row in cursor.fetchall()}
+        self.db_worker.submit("compare", load, lambda results: self.show_compare(selected, results))
+
+    def show_compare(self, selected, results):
+        for employee_id, (_, _, info) in zip(selected, self.compare_slots):
+            if employee_id is None:
+                name, income, eligible, department, absences, tardies = "Select an employee", 0, False, "", 0, 0
+            elif employee_id in results:
+                _, name, department, income, eligible, absences, tardies = results[employee_id]
+            else:
+                name, income, eligible, department, absences, tardies = "Employee not found", 0, False, "", 0, 0
+            contribution = calculate_contribution(income, self.contribution_percentage, eligible)
+            info.config(text=f"Name: {self.blur_name(name)}\n"
+                             f"Department: {department}\n"
+                             f"Total Income: {self.format_currency(income)}\n"
+                             f"Contribution: {self.format_currency(contribution)}\n"
+                             f"Eligible: {'Yes' if eligible else 'No'}\n"
+                             f"Absences: {absences}\n"
+                             f"Tardies: {tardies}",
+                        font=self.compare_label_font)
 
     def delete_employee(self):
-        selected_item = self.tree.selection()
-        if not selected_item:
+        # Income, notes and attendance go with each employee through ON DELETE CASCADE; all the
+        # selected employees, including any scrolled out of view, are removed by one statement
+        # in one undo step
+        employee_ids = self.tree.selected_keys()
+        if not employee_ids:
             messagebox.showerror("Error", "Select an employee to delete")
             return
-        employee_id = self.tree.item(selected_item)["values"][0]
-        if messagebox.askyesno("Confirm", "Delete this employee, their income records, notes, and attendance records?"):
-            self.cursor.execute("DELETE FROM income WHERE employee_id = ?", (employee_id,))
-            self.cursor.execute("DELETE FROM notes WHERE employee_id = ?", (employee_id,))
-            self.cursor.execute("DELETE FROM attendance WHERE employee_id = ?", (employee_id,))
-            self.cursor.execute("DELETE FROM employees WHERE employee_id = ?", (employee_id,))
-            self.hypothetical_data.pop(employee_id, None)
-            self.conn.commit()
-            self.refresh_summary()
-            self.update_employee_combobox()
-            self.update_notes_combobox()
-            self.update_attendance_combobox()
-            self.update_compare_comboboxes()
-            self.refresh_scenarios()
-            messagebox.showinfo("Success", "Employee deleted")
+        if len(employee_ids) > 1:
+            prompt = f"Delete these {len(employee_ids)} employees, their income records, notes, and attendance records?"
+        else:
+            prompt = "Delete this employee, their income records, notes, and attendance records?"
+        if messagebox.askyesno("Confirm", prompt):
+            try:
+                with UnitOfWork(self.conn, f"Delete {len(employee_ids)} employees" if len(employee_ids) > 1 else "Delete employee") as work:
+                    work.delete("employees", f"employee_id IN ({', '.join('?' * len(employee_ids))})", employee_ids)
+            except sqlite3.Error as e:
+                messagebox.showerror("Error", f"Failed to delete employee: {e}")
+                return
+            self.employee_directory.invalidate()
+            self.scheduler.invalidate(*EMPLOYEE_LIST_VIEWS, *INCOME_VIEWS, "notes")
+            messagebox.showinfo("Success", f"{len(employee_ids)} employees deleted" if len(employee_ids) > 1 else "Employee deleted")
 
     def update_settings(self):
         try:
-            new_percentage = float(self.percentage_entry.get())
+            new_percentage = parse_percentage(self.percentage_entry.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        try:
             new_year = int(self.year_combobox.get())
-            if new_percentage < 0 or new_year < 1900 or new_year > 2100:
+            if new_year < 1900 or new_year > 2100:
                 raise ValueError
         except ValueError:
-            messagebox.showerror("Error", "Invalid percentage or year")
+            messagebox.showerror("Error", "Invalid year")
             return
         new_privacy_mode = self.privacy_var.get()
         self.set_fiscal_year(new_year)
@@ -1076,17 +1524,60 @@ class RetirementTrackerApp:
         self.contribution_percentage = new_percentage
         self.selected_year = new_year
         self.privacy_mode = new_privacy_mode
-        self.hypothetical_data.clear()  # Reset hypothetical data on settings change
-        self.total_profit_entry.delete(0, tk.END)
-        self.total_profit_entry.insert(0, str(self.get_total_profit()))
-        self.refresh_summary()
-        self.update_employee_combobox()
-        self.update_notes_combobox()
-        self.update_attendance_combobox()
-        self.update_compare_comboboxes()
-        self.refresh_scenarios()
+        self.hypothetical_columns = None  # Reset hypothetical data on settings change
+        self.show_total_profit()
+        self.scheduler.invalidate(*EMPLOYEE_LIST_VIEWS, *INCOME_VIEWS)
         messagebox.showinfo("Success", "Settings updated")
 
+    def on_journal_shortcut(self, event, step):
+        # In a text field Ctrl+Z/Ctrl+Y edit the text; only elsewhere do they undo a database change
+        if isinstance(event.widget, (tk.Entry, tk.Text, ttk.Entry, ttk.Combobox)):
+            return
+        step()
+
+    def undo(self, event=None):
+        try:
+            description = undo_batch(self.conn)
+        except (UndoConflict, sqlite3.Error) as e:
+            messagebox.showerror("Undo", str(e))
+            return
+        if description is None:
+            messagebox.showinfo("Undo", "Nothing to undo")
+            return
+        self.reload_after_journal_step()
+        messagebox.showinfo("Undo", f"Undone: {description}")
+
+    def redo(self, event=None):
+        try:
+            description = redo_batch(self.conn)
+        except (UndoConflict, sqlite3.Error) as e:
+            messagebox.showerror("Redo", str(e))
+            return
+        if description is None:
+            messagebox.showinfo("Redo", "Nothing to redo")
+            return
+        self.reload_after_journal_step()
+        messagebox.showinfo("Redo", f"Redone: {description}")
+
+    def reload_after_journal_step(self):
+        # A batch can touch any table, so everything derived from the database is reloaded
+        self.employee_directory.invalidate()
+        self.show_total_profit()
+        self.scheduler.invalidate(*EMPLOYEE_LIST_VIEWS, *INCOME_VIEWS, "notes")
+
+    def verify_income_rollup(self):
+        mismatches = find_income_rollup_mismatches(self.cursor)
+        if mismatches:
+            messagebox.showwarning("Income Rollup", f"{len(mismatches)} employee/fiscal year totals do not match the income records. Use Rebuild Income Rollup to repair them.")
+        else:
+            messagebox.showinfo("Income Rollup", "Income rollup matches the income records")
+
+    def repair_income_rollup(self):
+        rebuild_income_rollup(self.cursor)
+        self.conn.commit()
+        self.scheduler.invalidate(*INCOME_VIEWS)
+        messagebox.showinfo("Success", "Income rollup rebuilt")
+
     def view_employee_income(self):
         income_window = tk.Toplevel(self.root)
         income_window.title("Employee Income Records")
@@ -1094,61 +1585,59 @@ class RetirementTrackerApp:
         ttk.Label(income_window, text="Select Employee:", font=self.label_font).pack(pady=5)
         income_employee_combobox = ttk.Combobox(income_window)
         income_employee_combobox.pack(pady=5)
-        self.cursor.execute("SELECT employee_id, name FROM employees")
-        employees = [(row[0], row[1]) for row in self.cursor.fetchall()]
-        income_employee_combobox["values"] = [f"{id}: {self.blur_name(name)}" for id, name in employees]
-        if employees:
-            selected_item = self.tree.selection()
-            if selected_item:
-                employee_id = self.tree.item(selected_item)["values"][0]
-                for i, (id, name) in enumerate(employees):
-                    if id == employee_id:
-                        income_employee_combobox.current(i)
-                        break
+        employee_values = self.employee_directory.get_labels(self.privacy_mode)
+        income_employee_combobox["values"] = employee_values
+        if employee_values:
+            employee_id = self.tree.current_key()
+            if employee_id is not None:
+                position = self.employee_directory.position(employee_id)
+                if position is not None:
+                    income_employee_combobox.current(position)
             else:
                 income_employee_combobox.current(0)
-        income_tree = ttk.Treeview(income_window, columns=("Income ID", "Date", "Amount", "Type"), show="headings", style="Big.Treeview")
+        income_tree = self.create_virtual_tree(income_window, ("Income ID", "Date", "Amount", "Type"))
         income_tree.heading("Income ID", text="ID")
         income_tree.heading("Date", text="Date")
         income_tree.heading("Amount", text="Amount")
         income_tree.heading("Type", text="Type")
         income_tree.column("Amount", anchor='e')
-        income_tree.pack(pady=10, fill='both', expand=True)
         def update_income_table(event=None):
-            for item in income_tree.get_children():
-                income_tree.delete(item)
             employee_str = income_employee_combobox.get()
             if not employee_str:
+                income_tree.set_rows([])
                 return
             employee_id = int(employee_str.split(":")[0])
             self.cursor.execute(
                 "SELECT income_id, date, amount, type FROM income WHERE employee_id = ? ORDER BY date ASC",
                 (employee_id,)
             )
-            for row in self.cursor.fetchall():
-                db_date = row[1]
-                display_date = datetime.strptime(db_date, "%Y-%m-%d").strftime("%m-%d-%Y")
-                income_tree.insert("", tk.END, values=(row[0], display_date, self.format_currency(row[2]), row[3]))
+            fetched = self.cursor.fetchall()
+            rows = [(row[0], display_date, self.format_currency(row[2]), row[3])
+                    for row, display_date in zip(fetched, format_days([row[1] for row in fetched]))]
+            income_tree.set_rows(rows)
         ttk.Button(income_window, text="Edit Selected Income", command=lambda: self.edit_income(income_tree, income_employee_combobox, update_income_table), style="Big.TButton").pack(pady=5)
         ttk.Button(income_window, text="Delete Selected Income", command=lambda: self.delete_income(income_tree, update_income_table), style="Big.TButton").pack(pady=5)
         income_employee_combobox.bind("<<ComboboxSelected>>", update_income_table)
         update_income_table()
 
     def delete_income(self, tree, update_func):
-        selected_item = tree.selection()
-        if not selected_item:
+        # Every selected row goes in one transaction and one undo step
+        ids = tree.selected_keys()
+        if not ids:
             messagebox.showerror("Error", "Select an income record to delete")
             return
-        if not messagebox.askyesno("Confirm", "Delete this income record?"):
+        prompt = f"Delete these {len(ids)} income records?" if len(ids) > 1 else "Delete this income record?"
+        if not messagebox.askyesno("Confirm", prompt):
+            return
+        try:
+            with UnitOfWork(self.conn, f"Delete {len(ids)} income records" if len(ids) > 1 else "Delete income record") as work:
+                work.delete("income", f"income_id IN ({', '.join('?' * len(ids))})", ids)
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"Failed to delete income record: {e}")
             return
-        income_id = tree.item(selected_item)["values"][0]
-        self.cursor.execute("DELETE FROM income WHERE income_id = ?", (income_id,))
-        self.conn.commit()
         update_func()
-        self.refresh_summary()
-        self.refresh_scenarios()
-        self.refresh_compare()
-        messagebox.showinfo("Success", "Income record deleted")
+        self.scheduler.invalidate(*INCOME_VIEWS)
+        messagebox.showinfo("Success", f"{len(ids)} income records deleted" if len(ids) > 1 else "Income record deleted")
 
     def view_employee_notes(self):
         notes_window = tk.Toplevel(self.root)
@@ -1157,58 +1646,58 @@ class RetirementTrackerApp:
         ttk.Label(notes_window, text="Select Employee:", font=self.label_font).pack(pady=5)
         notes_employee_combobox = ttk.Combobox(notes_window)
         notes_employee_combobox.pack(pady=5)
-        self.cursor.execute("SELECT employee_id, name FROM employees")
-        employees = [(row[0], row[1]) for row in self.cursor.fetchall()]
-        notes_employee_combobox["values"] = [f"{id}: {self.blur_name(name)}" for id, name in employees]
-        if employees:
-            selected_item = self.tree.selection()
-            if selected_item:
-                employee_id = self.tree.item(selected_item)["values"][0]
-                for i, (id, name) in enumerate(employees):
-                    if id == employee_id:
-                        notes_employee_combobox.current(i)
-                        break
+        employee_values = self.employee_directory.get_labels(self.privacy_mode)
+        notes_employee_combobox["values"] = employee_values
+        if employee_values:
+            employee_id = self.tree.current_key()
+            if employee_id is not None:
+                position = self.employee_directory.position(employee_id)
+                if position is not None:
+                    notes_employee_combobox.current(position)
             else:
                 notes_employee_combobox.current(0)
-        notes_tree = ttk.Treeview(notes_window, columns=("Note ID", "Date", "Note"), show="headings", style="Big.Treeview")
+        notes_tree = self.create_virtual_tree(notes_window, ("Note ID", "Date", "Note"))
         notes_tree.heading("Note ID", text="ID")
         notes_tree.heading("Date", text="Date")
         notes_tree.heading("Note", text="Note")
         notes_tree.column("Note", width=300)
-        notes_tree.pack(pady=10, fill='both', expand=True)
         def update_notes_table(event=None):
-            for item in notes_tree.get_children():
-                notes_tree.delete(item)
             employee_str = notes_employee_combobox.get()
             if not employee_str:
+                notes_tree.set_rows([])
                 return
             employee_id = int(employee_str.split(":")[0])
             self.cursor.execute(
                 "SELECT note_id, date, note_text FROM notes WHERE employee_id = ? ORDER BY date DESC",
                 (employee_id,)
             )
-            for row in self.cursor.fetchall():
-                db_date = row[1]
-                display_date = datetime.strptime(db_date, "%Y-%m-%d").strftime("%m-%d-%Y")
-                notes_tree.insert("", tk.END, values=(row[0], display_date, row[2]))
+            fetched = self.cursor.fetchall()
+            rows = [(row[0], display_date, row[2])
+                    for row, display_date in zip(fetched, format_days([row[1] for row in fetched]))]
+            notes_tree.set_rows(rows)
         ttk.Button(notes_window, text="Edit Selected Note", command=lambda: self.edit_note(notes_tree, notes_employee_combobox, update_notes_table), style="Big.TButton").pack(pady=5)
         ttk.Button(notes_window, text="Delete Selected Note", command=lambda: self.delete_note(notes_tree, update_notes_table), style="Big.TButton").pack(pady=5)
         notes_employee_combobox.bind("<<ComboboxSelected>>", update_notes_table)
         update_notes_table()
 
     def delete_note(self, tree, update_func):
-        selected_item = tree.selection()
-        if not selected_item:
+        # Every selected row goes in one transaction and one undo step
+        ids = tree.selected_keys()
+        if not ids:
             messagebox.showerror("Error", "Select a note to delete")
             return
-        if not messagebox.askyesno("Confirm", "Delete this note?"):
+        prompt = f"Delete these {len(ids)} notes?" if len(ids) > 1 else "Delete this note?"
+        if not messagebox.askyesno("Confirm", prompt):
+            return
+        try:
+            with UnitOfWork(self.conn, f"Delete {len(ids)} notes" if len(ids) > 1 else "Delete note") as work:
+                work.delete("notes", f"note_id IN ({', '.join('?' * len(ids))})", ids)
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"Failed to delete note: {e}")
             return
-        note_id = tree.item(selected_item)["values"][0]
-        self.cursor.execute("DELETE FROM notes WHERE note_id = ?", (note_id,))
-        self.conn.commit()
         update_func()
-        self.update_notes_display()
-        messagebox.showinfo("Success", "Note deleted")
+        self.scheduler.invalidate("notes")
+        messagebox.showinfo("Success", f"{len(ids)} notes deleted" if len(ids) > 1 else "Note deleted")
 
     def view_employee_attendance(self):
         attendance_window = tk.Toplevel(self.root)
@@ -1217,64 +1706,63 @@ class RetirementTrackerApp:
         ttk.Label(attendance_window, text="Select Employee:", font=self.label_font).pack(pady=5)
         attendance_employee_combobox = ttk.Combobox(attendance_window)
         attendance_employee_combobox.pack(pady=5)
-        self.cursor.execute("SELECT employee_id, name FROM employees")
-        employees = [(row[0], row[1]) for row in self.cursor.fetchall()]
-        attendance_employee_combobox["values"] = [f"{id}: {self.blur_name(name)}" for id, name in employees]
-        if employees:
-            selected_item = self.tree.selection()
-            if selected_item:
-                employee_id = self.tree.item(selected_item)["values"][0]
-                for i, (id, name) in enumerate(employees):
-                    if id == employee_id:
-                        attendance_employee_combobox.current(i)
-                        break
+        employee_values = self.employee_directory.get_labels(self.privacy_mode)
+        attendance_employee_combobox["values"] = employee_values
+        if employee_values:
+            employee_id = self.tree.current_key()
+            if employee_id is not None:
+                position = self.employee_directory.position(employee_id)
+                if position is not None:
+                    attendance_employee_combobox.current(position)
             else:
                 attendance_employee_combobox.current(0)
-        attendance_tree = ttk.Treeview(attendance_window, columns=("Attendance ID", "Date", "Status"), show="headings", style="Big.Treeview")
+        attendance_tree = self.create_virtual_tree(attendance_window, ("Attendance ID", "Date", "Status"))
         attendance_tree.heading("Attendance ID", text="ID")
         attendance_tree.heading("Date", text="Date")
         attendance_tree.heading("Status", text="Status")
-        attendance_tree.pack(pady=10, fill='both', expand=True)
         def update_attendance_table(event=None):
-            for item in attendance_tree.get_children():
-                attendance_tree.delete(item)
             employee_str = attendance_employee_combobox.get()
             if not employee_str:
+                attendance_tree.set_rows([])
                 return
             employee_id = int(employee_str.split(":")[0])
             self.cursor.execute(
                 "SELECT attendance_id, date, status FROM attendance WHERE employee_id = ? ORDER BY date DESC",
                 (employee_id,)
             )
-            for row in self.cursor.fetchall():
-                db_date = row[1]
-                display_date = datetime.strptime(db_date, "%Y-%m-%d").strftime("%m-%d-%Y")
-                attendance_tree.insert("", tk.END, values=(row[0], display_date, row[2]))
+            fetched = self.cursor.fetchall()
+            rows = [(row[0], display_date, row[2])
+                    for row, display_date in zip(fetched, format_days([row[1] for row in fetched]))]
+            attendance_tree.set_rows(rows)
         ttk.Button(attendance_window, text="Edit Selected Attendance", command=lambda: self.edit_attendance(attendance_tree, attendance_employee_combobox, update_attendance_table), style="Big.TButton").pack(pady=5)
         ttk.Button(attendance_window, text="Delete Selected Attendance", command=lambda: self.delete_attendance(attendance_tree, update_attendance_table), style="Big.TButton").pack(pady=5)
         attendance_employee_combobox.bind("<<ComboboxSelected>>", update_attendance_table)
         update_attendance_table()
 
     def delete_attendance(self, tree, update_func):
-        selected_item = tree.selection()
-        if not selected_item:
+        # Every selected row goes in one transaction and one undo step
+        ids = tree.selected_keys()
+        if not ids:
             messagebox.showerror("Error", "Select an attendance record to delete")
             return
-        if not messagebox.askyesno("Confirm", "Delete this attendance record?"):
+        prompt = f"Delete these {len(ids)} attendance records?" if len(ids) > 1 else "Delete this attendance record?"
+        if not messagebox.askyesno("Confirm", prompt):
+            return
+        try:
+            with UnitOfWork(self.conn, f"Delete {len(ids)} attendance records" if len(ids) > 1 else "Delete attendance record") as work:
+                work.delete("attendance", f"attendance_id IN ({', '.join('?' * len(ids))})", ids)
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"Failed to delete attendance record: {e}")
             return
-        attendance_id = tree.item(selected_item)["values"][0]
-        self.cursor.execute("DELETE FROM attendance WHERE attendance_id = ?", (attendance_id,))
-        self.conn.commit()
         update_func()
-        self.refresh_compare()
-        messagebox.showinfo("Success", "Attendance record deleted")
+        self.scheduler.invalidate("compare")
+        messagebox.showinfo("Success", f"{len(ids)} attendance records deleted" if len(ids) > 1 else "Attendance record deleted")
 
     def edit_note(self, notes_tree, notes_employee_combobox, update_notes_table):
-        selected_item = notes_tree.selection()
-        if not selected_item:
+        values = notes_tree.current_values()
+        if values is None:
             messagebox.showerror("Error", "Select a note to edit")
             return
-        values = notes_tree.item(selected_item)["values"]
         note_id = values[0]
         current_date = values[1]
         current_note = values[2]
@@ -1297,28 +1785,27 @@ class RetirementTrackerApp:
                 messagebox.showerror("Error", "Note and date are required")
                 return
             try:
-                parsed_date = datetime.strptime(new_date, "%m-%d-%Y")
-                db_date = parsed_date.strftime("%Y-%m-%d")
+                db_date = day_from_display(new_date)
             except ValueError:
                 messagebox.showerror("Error", "Invalid date format (use MM-DD-YYYY)")
                 return
-            self.cursor.execute(
-                "UPDATE notes SET note_text = ?, date = ? WHERE note_id = ?",
-                (new_note, db_date, note_id)
-            )
-            self.conn.commit()
+            try:
+                with UnitOfWork(self.conn, "Edit note") as work:
+                    work.update("notes", note_id, {"note_text": new_note, "date": db_date})
+            except sqlite3.Error as e:
+                messagebox.showerror("Error", f"Failed to update note: {e}")
+                return
             update_notes_table()
-            self.update_notes_display()
+            self.scheduler.invalidate("notes")
             edit_window.destroy()
             messagebox.showinfo("Success", "Note updated")
         ttk.Button(edit_window, text="Save Changes", command=save_changes, style="Big.TButton").grid(row=2, column=0, columnspan=2, pady=10)
 
     def edit_attendance(self, attendance_tree, attendance_employee_combobox, update_attendance_table):
-        selected_item = attendance_tree.selection()
-        if not selected_item:
+        values = attendance_tree.current_values()
+        if values is None:
             messagebox.showerror("Error", "Select an attendance record to edit")
             return
-        values = attendance_tree.item(selected_item)["values"]
         attendance_id = values[0]
         current_date = values[1]
         current_status = values[2]
@@ -1341,39 +1828,38 @@ class RetirementTrackerApp:
                 messagebox.showerror("Error", "Date and status are required")
                 return
             try:
-                parsed_date = datetime.strptime(new_date, "%m-%d-%Y")
-                db_date = parsed_date.strftime("%Y-%m-%d")
+                db_date = day_from_display(new_date)
             except ValueError:
                 messagebox.showerror("Error", "Invalid date format (use MM-DD-YYYY)")
                 return
-            self.cursor.execute(
-                "UPDATE attendance SET date = ?, status = ? WHERE attendance_id = ?",
-                (db_date, new_status, attendance_id)
-            )
-            self.conn.commit()
+            try:
+                with UnitOfWork(self.conn, "Edit attendance record") as work:
+                    work.update("attendance", attendance_id, {"date": db_date, "status": new_status})
+            except sqlite3.Error as e:
+                messagebox.showerror("Error", f"Failed to update attendance record: {e}")
+                return
             update_attendance_table()
-            self.refresh_compare()
+            self.scheduler.invalidate("compare")
             edit_window.destroy()
             messagebox.showinfo("Success", "Attendance record updated")
         ttk.Button(edit_window, text="Save Changes", command=save_changes, style="Big.TButton").grid(row=2, column=0, columnspan=2, pady=10)
 
     def edit_income(self, income_tree, income_employee_combobox, update_income_table):
-        selected_item = income_tree.selection()
-        if not selected_item:
+        values = income_tree.current_values()
+        if values is None:
             messagebox.showerror("Error", "Select an income record to edit")
             return
-        values = income_tree.item(selected_item)["values"]
         income_id = values[0]
         current_date = values[1]
         current_amount_str = values[2].replace("$", "").replace(",", "").replace("(", "").replace(")", "")
-        current_amount = float(current_amount_str)
+        current_amount = cents_from_amount(current_amount_str)
         current_type = values[3]
         edit_window = tk.Toplevel(self.root)
         edit_window.title("Edit Income Record")
         edit_window.geometry("300x200")
         ttk.Label(edit_window, text="Amount:", font=self.label_font).grid(row=0, column=0, padx=5, pady=5)
         amount_entry = ttk.Entry(edit_window, justify='right')
-        amount_entry.insert(0, str(current_amount))
+        amount_entry.insert(0, format_cents(current_amount))
         amount_entry.grid(row=0, column=1, padx=5, pady=5)
         ttk.Label(edit_window, text="Date (MM-DD-YYYY):", font=self.label_font).grid(row=1, column=0, padx=5, pady=5)
         date_entry = ttk.Entry(edit_window)
@@ -1386,7 +1872,7 @@ class RetirementTrackerApp:
         type_combobox.grid(row=2, column=1, padx=5, pady=5)
         def save_changes():
             try:
-                new_amount = float(amount_entry.get())
+                new_amount = cents_from_amount(amount_entry.get())
                 if new_amount <= 0:
                     raise ValueError("Amount must be positive")
                 new_date = date_entry.get()
@@ -1394,20 +1880,18 @@ class RetirementTrackerApp:
                 if not new_amount or not new_date or not new_type:
                     messagebox.showerror("Error", "All fields are required")
                     return
-                parsed_date = datetime.strptime(new_date, "%m-%d-%Y")
-                db_date = parsed_date.strftime("%Y-%m-%d")
+                db_date = day_from_display(new_date)
             except ValueError as e:
                 messagebox.showerror("Error", str(e) or "Invalid amount or date format (use MM-DD-YYYY)")
                 return
-            self.cursor.execute(
-                "UPDATE income SET amount = ?, date = ?, type = ? WHERE income_id = ?",
-                (new_amount, db_date, new_type, income_id)
-            )
-            self.conn.commit()
+            try:
+                with UnitOfWork(self.conn, "Edit income record") as work:
+                    work.update("income", income_id, {"amount": new_amount, "date": db_date, "type": new_type})
+            except sqlite3.Error as e:
+                messagebox.showerror("Error", f"Failed to update income record: {e}")
+                return
             update_income_table()
-            self.refresh_summary()
-            self.refresh_scenarios()
-            self.refresh_compare()
+            self.scheduler.invalidate(*INCOME_VIEWS)
             edit_window.destroy()
             messagebox.showinfo("Success", "Income record updated")
         ttk.Button(edit_window, text="Save Changes", command=save_changes, style="Big.TButton").grid(row=3, column=0, columnspan=2, pady=10)
@@ -1421,23 +1905,23 @@ class RetirementTrackerApp:
 
     def calculate_income_statement(self):
         try:
-            revenue = float(self.revenue_entry.get() if self.revenue_entry.get() != "0.00" else 0)
-            cost_of_sales = float(self.cost_of_sales_entry.get() if self.cost_of_sales_entry.get() != "0.00" else 0)
+            revenue = cents_from_amount(self.revenue_entry.get())
+            cost_of_sales = cents_from_amount(self.cost_of_sales_entry.get())
             gross_profit = revenue - cost_of_sales
             self.gross_profit_label.config(text=f"Gross Profit: {self.format_currency(gross_profit)}")
-            admin_expenses = float(self.admin_expenses_entry.get() if self.admin_expenses_entry.get() != "0.00" else 0)
-            other_operating_expenses = float(self.other_operating_expenses_entry.get() if self.other_operating_expenses_entry.get() != "0.00" else 0)
+            admin_expenses = cents_from_amount(self.admin_expenses_entry.get())
+            other_operating_expenses = cents_from_amount(self.other_operating_expenses_entry.get())
             operating_profit = gross_profit - admin_expenses - other_operating_expenses
             self.operating_profit_label.config(text=f"Operating Profit: {self.format_currency(operating_profit)}")
-            finance_costs = float(self.finance_costs_entry.get() if self.finance_costs_entry.get() != "0.00" else 0)
-            other_income = float(self.other_income_entry.get() if self.other_income_entry.get() != "0.00" else 0)
+            finance_costs = cents_from_amount(self.finance_costs_entry.get())
+            other_income = cents_from_amount(self.other_income_entry.get())
             profit_before_tax = operating_profit - finance_costs + other_income
             self.profit_before_tax_label.config(text=f"Profit Before Tax: {self.format_currency(profit_before_tax)}")
-            tax = float(self.tax_entry.get() if self.tax_entry.get() != "0.00" else 0)
+            tax = cents_from_amount(self.tax_entry.get())
             profit_after_tax = profit_before_tax - tax
             self.profit_after_tax_label.config(text=f"Profit After Tax: {self.format_currency(profit_after_tax)}")
             self.total_profit_entry.delete(0, tk.END)
-            self.total_profit_entry.insert(0, str(profit_before_tax))
+            self.total_profit_entry.insert(0, format_cents(profit_before_tax))
             self.analysis_text.config(state='normal')
             self.analysis_text.delete(1.0, tk.END)
             analysis = []
@@ -1459,9 +1943,13 @@ class RetirementTrackerApp:
             messagebox.showerror("Error", "Invalid input in income statement fields")
 
     def import_pdf(self):
-        if 'PyPDF2' not in globals():
+        # PyPDF2 is optional and slow to import, so it is loaded on first use
+        try:
+            import PyPDF2
+        except ImportError:
             messagebox.showerror("Error", "PyPDF2 library not found. Please install it using 'pip install PyPDF2'")
             return
+        import re
         file_path = filedialog.askopenfilename(filetypes=[("PDF files", "*.pdf")])
         if not file_path:
             return
@@ -1525,6 +2013,7 @@ class RetirementTrackerApp:
             messagebox.showerror("Error", f"Failed to process PDF: {str(e)}")
 
     def __del__(self):
+        self.db_worker.close()
         self.conn.close()
 
 # Run the application
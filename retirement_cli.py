@@ -0,0 +1,169 @@
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+from retirement_import import import_income_file, parse_date
+from retirement_dates import iso_from_day
+from retirement_money import format_cents, parse_percentage
+from retirement_export import EXPORT_NAMES, EXPORT_FORMATS, export_to_file
+from retirement_engine import (
+    open_database, open_read_only, fiscal_year_range, read_settings, read_total_profit,
+    calculate_contributions, summarize_contributions,
+)
+
+# Command-line entry points for the tracker. Nothing here imports tkinter, so reports
+# can run from cron or over ssh without a display.
+
+EMPLOYEE_HEADER = ["database", "fiscal_year", "employee_id", "name", "department", "total_income", "contribution", "eligible"]
+TOTALS_HEADER = ["database", "fiscal_year", "total_income", "total_contribution", "taxable_income", "total_spend"]
+
+def percentage_arg(value):
+    try:
+        return parse_percentage(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def parse_years(values):
+    # Accepts single years and inclusive ranges, e.g. ["2019", "2021-2024"]
+    years = []
+    for value in values:
+        first, _, last = value.partition("-")
+        try:
+            first = int(first)
+            last = int(last) if last else first
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid year: {value}")
+        if last < first:
+            raise argparse.ArgumentTypeError(f"invalid year range: {value}")
+        years.extend(range(first, last + 1))
+    return years
+
+def write_report(writer, path, years, contribution_percentage, totals_only):
+    conn = open_read_only(path)
+    try:
+        cursor = conn.cursor()
+        settings = read_settings(cursor)
+        if contribution_percentage is None:
+            contribution_percentage = settings["contribution_percentage"]
+        for year in years or [settings["selected_year"]]:
+            start_date, end_date = fiscal_year_range(year)
+            columns = calculate_contributions(cursor, start_date, end_date, contribution_percentage, year)
+            if totals_only:
+                total_profit = read_total_profit(cursor, year)
+                total_income, total_contribution, total_spend = summarize_contributions(columns, total_profit)
+                writer.writerow([path, year, format_cents(total_income), format_cents(total_contribution), format_cents(total_profit), format_cents(total_spend)])
+                continue
+            for i in range(len(columns)):
+                employee_id, name, department, income, contribution, eligible = columns.row(i)
+                writer.writerow([path, year, employee_id, name, department or "", format_cents(income), format_cents(contribution), "Yes" if eligible else "No"])
+    finally:
+        conn.close()
+
+def run_report(args):
+    try:
+        years = parse_years(args.year)
+    except argparse.ArgumentTypeError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    writer = csv.writer(sys.stdout, delimiter="\t" if args.format == "tsv" else ",", lineterminator="\n")
+    writer.writerow(TOTALS_HEADER if args.totals else EMPLOYEE_HEADER)
+    for path in args.db or ["retirement.db"]:
+        try:
+            write_report(writer, path, years, args.percentage, args.totals)
+        except sqlite3.Error as e:
+            print(f"error: {path}: {e}", file=sys.stderr)
+            return 1
+    return 0
+
+def run_import_income(args):
+    # sqlite3 would create a mistyped --db as an empty database and import into that
+    if not os.path.exists(args.db):
+        print(f"error: no database at {args.db}", file=sys.stderr)
+        return 2
+    conn = None
+    try:
+        conn = open_database(args.db)
+        imported, rejected = import_income_file(conn, args.file, args.rejects, args.chunk_size)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if conn is not None:
+            conn.close()
+    print(f"imported {imported}, rejected {rejected}", file=sys.stderr)
+    if rejected and args.rejects:
+        print(f"rejected rows written to {args.rejects}", file=sys.stderr)
+    return 1 if rejected else 0
+
+def run_export(args):
+    if (args.start is None) != (args.end is None):
+        print("error: --start and --end must be given together", file=sys.stderr)
+        return 2
+    if args.format == "columnar" and args.output == "-":
+        print("error: columnar output needs a file, not stdout", file=sys.stderr)
+        return 2
+    conn = None
+    try:
+        conn = open_read_only(args.db)
+        cursor = conn.cursor()
+        settings = read_settings(cursor)
+        contribution_percentage = settings["contribution_percentage"] if args.percentage is None else args.percentage
+        # Same default as the Summary tab: the selected fiscal year unless a range is given
+        if args.start is not None:
+            start_date, end_date = iso_from_day(parse_date(args.start)), iso_from_day(parse_date(args.end))
+            selected_year = None
+        else:
+            selected_year = args.year if args.year is not None else settings["selected_year"]
+            start_date, end_date = fiscal_year_range(selected_year)
+        count = export_to_file(cursor, args.table, args.output, args.format, start_date, end_date, args.employee or None, contribution_percentage, selected_year)
+    except BrokenPipeError:
+        raise
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if conn is not None:
+            conn.close()
+    print(f"exported {count} {args.table} rows", file=sys.stderr)
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="active_2.py", description="Retirement tracker batch commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    report = commands.add_parser("report", help="Summary figures per fiscal year, read-only")
+    report.add_argument("--year", action="append", default=[], help="fiscal year or range such as 2020-2025; repeatable (default: the selected year)")
+    report.add_argument("--db", action="append", help="database file; repeatable (default: retirement.db)")
+    report.add_argument("--format", choices=("csv", "tsv"), default="csv")
+    report.add_argument("--percentage", type=percentage_arg, help="contribution percentage (default: the database setting)")
+    report.add_argument("--totals", action="store_true", help="one line of totals per database and year instead of one per employee")
+    report.set_defaults(func=run_report)
+    import_income = commands.add_parser("import-income", help="Bulk-load income rows from a CSV or TSV file")
+    import_income.add_argument("file", help="header row with employee_id or name, amount, date and type columns")
+    import_income.add_argument("--db", default="retirement.db", help="existing database file (default: retirement.db)")
+    import_income.add_argument("--rejects", help="write rejected rows to this CSV file")
+    import_income.add_argument("--chunk-size", type=int, default=5000, help="rows per transaction (default: 5000)")
+    import_income.set_defaults(func=run_import_income)
+    export = commands.add_parser("export", help="Stream a table or the summary to CSV or the columnar format, read-only")
+    export.add_argument("table", choices=EXPORT_NAMES)
+    export.add_argument("--output", "-o", default="-", help="output file (default: stdout, CSV only)")
+    export.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    export.add_argument("--db", default="retirement.db", help="database file (default: retirement.db)")
+    export.add_argument("--year", type=int, help="fiscal year (default: the selected year)")
+    export.add_argument("--start", help="start date, MM-DD-YYYY or YYYY-MM-DD; use with --end instead of --year")
+    export.add_argument("--end", help="end date, inclusive")
+    export.add_argument("--employee", type=int, action="append", help="employee id; repeatable (default: everyone)")
+    export.add_argument("--percentage", type=percentage_arg, help="contribution percentage for the summary (default: the database setting)")
+    export.set_defaults(func=run_export)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except BrokenPipeError:
+        # Output piped into head and the like
+        return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+from datetime import date, datetime
+from functools import lru_cache
+
+# income, notes and attendance store dates as integer day numbers: proleptic Gregorian
+# ordinals as returned by date.toordinal(), so 0001-01-01 is day 1. SQLite's julianday()
+# counts the same days shifted by JULIAN_OFFSET, which is how SQL turns them back into
+# ISO text (see the *_iso views).
+JULIAN_OFFSET = 1721424.5
+DISPLAY_FORMAT = "%m-%d-%Y"
+
+def day_from_iso(value):
+    return date.fromisoformat(value).toordinal()
+
+def iso_from_day(day):
+    return date.fromordinal(day).isoformat()
+
+def day_from_display(value):
+    # MM-DD-YYYY as typed in the tracker; raises ValueError like strptime
+    return datetime.strptime(value, DISPLAY_FORMAT).toordinal()
+
+@lru_cache(maxsize=8192)
+def format_day(day):
+    # MM-DD-YYYY for display; histories repeat the same few thousand days, so this is cached
+    if day is None:
+        return ""
+    value = date.fromordinal(day)
+    return f"{value.month:02d}-{value.day:02d}-{value.year:04d}"
+
+def format_days(days):
+    return list(map(format_day, days))
+
+def sql_iso_date(column):
+    # SQL expression giving the ISO date for a day-number column
+    return f"date({column} + {JULIAN_OFFSET})"
+
+def sql_day_from_iso(column):
+    # SQL expression converting an ISO date column to a day number (NULL if not a date)
+    return f"CAST(julianday({column}) - {JULIAN_OFFSET} AS INTEGER)"
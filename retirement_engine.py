@@ -0,0 +1,213 @@
+import calendar
+from array import array
+import sqlite3
+from datetime import datetime
+from retirement_schema import SCHEMA_VERSION, get_schema_version, migrate
+from retirement_dates import day_from_iso
+from retirement_money import basis_points, apply_basis_points
+
+# Contribution calculations over retirement.db with no GUI dependency, so they can be run
+# from scripts and scheduled jobs as well as from the tracker itself. Date ranges are
+# inclusive ISO strings here; the tables store day numbers (see retirement_dates).
+# Money is in integer cents throughout (see retirement_money).
+
+def build_income_totals_query(start_date, end_date, fiscal_year=None, employee_ids=None):
+    # One row per employee: (employee_id, name, department, total_income, eligible_for_retirement).
+    # The date range belongs to the join, not the WHERE clause, so employees without income in
+    # the range still get a zero row and each employee's income is an index range on
+    # idx_income_employee_date. A fiscal year is read from income_rollup instead.
+    if fiscal_year is not None:
+        total = "COALESCE(r.total, 0)"
+        join = "LEFT JOIN income_rollup r ON r.employee_id = e.employee_id AND r.fiscal_year = ?"
+        group = ""
+        params = [fiscal_year]
+    else:
+        total = "COALESCE(SUM(i.amount), 0)"
+        join = "LEFT JOIN income i ON i.employee_id = e.employee_id AND i.date BETWEEN ? AND ?"
+        group = "GROUP BY e.employee_id"
+        params = [day_from_iso(start_date), day_from_iso(end_date)]
+    where = ""
+    if employee_ids is not None:
+        where = f"WHERE e.employee_id IN ({', '.join('?' * len(employee_ids))})"
+        params.extend(employee_ids)
+    query = f"""
+        SELECT e.employee_id, e.name, e.department, {total} AS total_income, e.eligible_for_retirement
+        FROM employees e
+        {join}
+        {where}
+        {group}
+        ORDER BY e.employee_id
+    """
+    return query, params
+
+def build_compare_query(start_date, end_date, employee_ids, fiscal_year=None):
+    # Income totals plus absence and tardy counts for the given employees in one statement.
+    # Rows are (employee_id, name, department, total_income, eligible_for_retirement,
+    # absences, tardies); attendance is counted with conditional aggregation over a single
+    # pass of idx_attendance_employee_status_date.
+    totals_query, params = build_income_totals_query(start_date, end_date, fiscal_year, employee_ids)
+    placeholders = ', '.join('?' * len(employee_ids))
+    query = f"""
+        SELECT t.employee_id, t.name, t.department, t.total_income, t.eligible_for_retirement,
+               COALESCE(a.absences, 0), COALESCE(a.tardies, 0)
+        FROM ({totals_query}) t
+        LEFT JOIN (
+            SELECT employee_id, SUM(status = 'Absent') AS absences, SUM(status = 'Tardy') AS tardies
+            FROM attendance
+            WHERE employee_id IN ({placeholders}) AND date BETWEEN ? AND ?
+            GROUP BY employee_id
+        ) a ON a.employee_id = t.employee_id
+        ORDER BY t.employee_id
+    """
+    return query, params + list(employee_ids) + [day_from_iso(start_date), day_from_iso(end_date)]
+
+# PRAGMAs applied to every connection at connect time. WAL lets the report and worker
+# connections read while the tracker writes, and makes each commit an append instead of
+# a journal rewrite; synchronous=NORMAL is durable across application crashes in WAL mode.
+CONNECTION_PROFILE = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "temp_store": "MEMORY",
+    "cache_size": -16000,  # KiB
+    "mmap_size": 256 * 1024 * 1024,
+    "busy_timeout": 5000,  # ms
+}
+# Settings that a read-only connection may not change (journal_mode is stored in the file)
+WRITE_ONLY_PRAGMAS = ("journal_mode", "synchronous")
+
+def apply_connection_profile(conn, profile=None, read_only=False):
+    # profile entries override CONNECTION_PROFILE; a value of None leaves that PRAGMA alone
+    settings = dict(CONNECTION_PROFILE, **(profile or {}))
+    for name, value in settings.items():
+        if value is None or (read_only and name in WRITE_ONLY_PRAGMAS):
+            continue
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+def open_database(path="retirement.db", profile=None):
+    # Connection with the schema brought up to date, for the tracker and batch jobs alike
+    conn = apply_connection_profile(sqlite3.connect(path), profile)
+    migrate(conn)
+    return conn
+
+def open_read_only(path, profile=None):
+    # Read-only URI connection: no migrations and no write locks taken. In WAL mode it can
+    # run alongside the tracker's writes. Databases on an older schema have to be opened
+    # once by the tracker (or import-income) first, since the queries assume the current one.
+    # pathlib pulls in urllib and ipaddress, so it is imported here rather than at startup
+    from pathlib import Path
+    conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        apply_connection_profile(conn, profile, read_only=True)
+        version = get_schema_version(conn)
+        if version < SCHEMA_VERSION:
+            raise sqlite3.DatabaseError(
+                f"schema version {version} is older than {SCHEMA_VERSION}; open the database in the tracker once to upgrade it"
+            )
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+def fiscal_year_range(year):
+    # Fiscal years run March 1 to the last day of the following February
+    return f"{year}-03-01", f"{year + 1}-02-{calendar.monthrange(year + 1, 2)[1]}"
+
+def read_settings(cursor):
+    cursor.execute("SELECT contribution_percentage, selected_year, privacy_mode FROM settings WHERE setting_id = 1")
+    result = cursor.fetchone() or (None, None, None)
+    contribution_percentage, selected_year, privacy_mode = result
+    return {
+        "contribution_percentage": contribution_percentage if contribution_percentage is not None else 5.0,
+        "selected_year": selected_year if selected_year is not None else datetime.now().year,
+        "privacy_mode": privacy_mode if privacy_mode is not None else 0,
+    }
+
+def read_total_profit(cursor, year):
+    cursor.execute("SELECT total_profit FROM taxable_income WHERE year = ?", (year,))
+    result = cursor.fetchone()
+    return result[0] if result and result[0] is not None else 0
+
+def calculate_contribution(income, contribution_percentage, eligible):
+    # Cents in, cents out
+    return apply_basis_points(income, basis_points(contribution_percentage)) if eligible else 0
+
+def fetch_employee_totals(cursor, start_date, end_date, selected_year=None, employee_ids=None):
+    # The selected fiscal year is served from income_rollup instead of scanning income
+    fiscal_year = None
+    if selected_year is not None and (start_date, end_date) == fiscal_year_range(selected_year):
+        fiscal_year = selected_year
+    query, params = build_income_totals_query(start_date, end_date, fiscal_year, employee_ids)
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+class EmployeeColumns:
+    # Column-oriented employee figures shared by the employee tables: ids, names and
+    # departments plus typed arrays for income and contribution (cents) and eligibility.
+    # Tables refer to rows by position, and totals are sums over a single array.
+    __slots__ = ("ids", "names", "departments", "income", "contribution", "eligible", "_positions")
+
+    def __init__(self, ids=(), names=(), departments=(), income=(), contribution=(), eligible=()):
+        self.ids = array('q', ids)
+        self.names = list(names)
+        self.departments = list(departments)
+        self.income = array('q', income)
+        self.contribution = array('q', contribution)
+        self.eligible = array('b', eligible)
+        self._positions = None
+
+    @property
+    def positions(self):
+        # employee_id -> row, built on first use; only the scenario tables look rows up by id
+        if self._positions is None:
+            self._positions = {employee_id: i for i, employee_id in enumerate(self.ids)}
+        return self._positions
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, i):
+        return (self.ids[i], self.names[i], self.departments[i], self.income[i], self.contribution[i], bool(self.eligible[i]))
+
+    def get_column(self, column):
+        return (self.ids, self.names, self.departments, self.income, self.contribution, self.eligible)[column]
+
+    def copy_figures(self):
+        # Shares the id, name and department columns; income, contribution and eligibility are copied
+        columns = EmployeeColumns.__new__(EmployeeColumns)
+        columns.ids = self.ids
+        columns.names = self.names
+        columns.departments = self.departments
+        columns._positions = self._positions
+        columns.income = array('q', self.income)
+        columns.contribution = array('q', self.contribution)
+        columns.eligible = array('b', self.eligible)
+        return columns
+
+    def total_income(self):
+        return sum(self.income)
+
+    def total_contribution(self):
+        return sum(self.contribution)
+
+def calculate_contributions(cursor, start_date, end_date, contribution_percentage, selected_year=None, employee_ids=None, format_name=None):
+    # Per-employee income and contribution for the date range as EmployeeColumns.
+    # format_name, when given, is applied to every name (e.g. privacy masking).
+    rows = fetch_employee_totals(cursor, start_date, end_date, selected_year, employee_ids)
+    points = basis_points(contribution_percentage)
+    return EmployeeColumns(
+        [row[0] for row in rows],
+        [format_name(row[1]) if format_name else row[1] for row in rows],
+        [row[2] for row in rows],
+        [row[3] for row in rows],
+        [apply_basis_points(row[3], points) if row[4] else 0 for row in rows],
+        [1 if row[4] else 0 for row in rows],
+    )
+
+def summarize_contributions(columns, total_profit):
+    # (total income, total contribution, total spend); spend is income plus contributions
+    # less the year's taxable profit
+    total_income = columns.total_income()
+    total_contribution = columns.total_contribution()
+    return total_income, total_contribution, total_income + total_contribution - total_profit
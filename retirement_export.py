@@ -0,0 +1,166 @@
+import csv
+import json
+import struct
+import sys
+import zlib
+from array import array
+from retirement_engine import calculate_contributions
+from retirement_dates import day_from_iso, sql_iso_date
+from retirement_money import format_cents
+
+# Streaming export of income, attendance, notes and the computed summary. Table rows are
+# read from the cursor in batches, so memory stays constant whatever the table size.
+#
+# The columnar format (.rtcol) is a small self-describing file:
+#   magic b"RTCOL1\n", u32 header length, JSON header {"table", "columns": [[name, type]]}
+#   then row groups: u32 row count, and per column u32 length + zlib-compressed block
+#   ending with a row count of 0. Integer and real blocks are a null-flag byte per row
+#   followed by little-endian int64/float64 values; text blocks are int32 byte lengths
+#   (-1 for NULL) followed by the UTF-8 bytes.
+#
+# Money columns have the type "cents" here. CSV shows them as exact decimal dollars
+# ("1200.50", as the report does); columnar files store the integer cents in an int
+# column named with a _cents suffix, e.g. amount_cents.
+
+BATCH_SIZE = 10000
+COLUMNAR_MAGIC = b"RTCOL1\n"
+EXPORT_FORMATS = ("csv", "columnar")
+
+# table: (select list with types, FROM clause, date column, ORDER BY). Dates are stored as
+# day numbers; exports show them as ISO text.
+EXPORT_TABLES = {
+    "income": ((("income_id", "int"), ("employee_id", "int"), ("amount", "cents"), ("date", "text"), ("type", "text")), "income", "date", "income_id"),
+    "attendance": ((("attendance_id", "int"), ("employee_id", "int"), ("date", "text"), ("status", "text")), "attendance", "date", "attendance_id"),
+    "notes": ((("note_id", "int"), ("employee_id", "int"), ("date", "text"), ("note_text", "text")), "notes", "date", "note_id"),
+}
+EXPORT_EXPRESSIONS = {"date": f"{sql_iso_date('date')} AS date"}
+SUMMARY_COLUMNS = (("employee_id", "int"), ("name", "text"), ("department", "text"), ("total_income", "cents"), ("contribution", "cents"), ("eligible", "int"))
+EXPORT_NAMES = ("summary", *EXPORT_TABLES)
+
+def iter_table_batches(cursor, table, start_date, end_date, employee_ids=None):
+    # Dates are inclusive ISO dates, the same range the Summary tab applies to income
+    columns, source, date_column, order = EXPORT_TABLES[table]
+    select_list = ", ".join(EXPORT_EXPRESSIONS.get(name, name) for name, _ in columns)
+    query = f"SELECT {select_list} FROM {source} WHERE {date_column} BETWEEN ? AND ?"
+    params = [day_from_iso(start_date), day_from_iso(end_date)]
+    if employee_ids is not None:
+        query += f" AND employee_id IN ({', '.join('?' * len(employee_ids))})"
+        params.extend(employee_ids)
+    cursor.execute(f"{query} ORDER BY {order}", params)
+    while True:
+        batch = cursor.fetchmany(BATCH_SIZE)
+        if not batch:
+            return
+        yield batch
+
+def iter_summary_batches(cursor, start_date, end_date, contribution_percentage, selected_year=None, employee_ids=None):
+    summary = calculate_contributions(cursor, start_date, end_date, contribution_percentage, selected_year, employee_ids)
+    for offset in range(0, len(summary), BATCH_SIZE):
+        yield [(summary.ids[i], summary.names[i], summary.departments[i], summary.income[i], summary.contribution[i], summary.eligible[i])
+               for i in range(offset, min(offset + BATCH_SIZE, len(summary)))]
+
+def export_batches(cursor, name, start_date, end_date, employee_ids=None, contribution_percentage=0, selected_year=None):
+    # Returns (columns, batches) for one of EXPORT_NAMES
+    if name == "summary":
+        return SUMMARY_COLUMNS, iter_summary_batches(cursor, start_date, end_date, contribution_percentage, selected_year, employee_ids)
+    return EXPORT_TABLES[name][0], iter_table_batches(cursor, name, start_date, end_date, employee_ids)
+
+def write_csv(file, columns, batches, delimiter=","):
+    writer = csv.writer(file, delimiter=delimiter, lineterminator="\n")
+    writer.writerow([name for name, _ in columns])
+    money = [index for index, (_, column_type) in enumerate(columns) if column_type == "cents"]
+    count = 0
+    for batch in batches:
+        if money:
+            batch = [list(row) for row in batch]
+            for row in batch:
+                for index in money:
+                    if row[index] is not None:
+                        row[index] = format_cents(row[index])
+        writer.writerows(batch)
+        count += len(batch)
+    return count
+
+def encode_column(values, column_type):
+    if column_type == "text":
+        lengths = array('i')
+        data = bytearray()
+        for value in values:
+            if value is None:
+                lengths.append(-1)
+            else:
+                encoded = str(value).encode("utf-8")
+                lengths.append(len(encoded))
+                data += encoded
+        if sys.byteorder != "little":
+            lengths.byteswap()
+        return lengths.tobytes() + bytes(data)
+    nulls = bytes(value is None for value in values)
+    numbers = array('q' if column_type == "int" else 'd', (0 if value is None else value for value in values))
+    if sys.byteorder != "little":
+        numbers.byteswap()
+    return nulls + numbers.tobytes()
+
+def decode_column(block, column_type, count):
+    if column_type == "text":
+        lengths = array('i')
+        lengths.frombytes(block[:4 * count])
+        if sys.byteorder != "little":
+            lengths.byteswap()
+        values, position = [], 4 * count
+        for length in lengths:
+            if length < 0:
+                values.append(None)
+            else:
+                values.append(block[position:position + length].decode("utf-8"))
+                position += length
+        return values
+    numbers = array('q' if column_type == "int" else 'd')
+    numbers.frombytes(block[count:])
+    if sys.byteorder != "little":
+        numbers.byteswap()
+    return [None if null else value for null, value in zip(block[:count], numbers)]
+
+def write_columnar(file, columns, batches, table=""):
+    columns = [(f"{name}_cents", "int") if column_type == "cents" else (name, column_type) for name, column_type in columns]
+    header = json.dumps({"table": table, "columns": [list(column) for column in columns]}).encode("utf-8")
+    file.write(COLUMNAR_MAGIC + struct.pack("<I", len(header)) + header)
+    count = 0
+    for batch in batches:
+        file.write(struct.pack("<I", len(batch)))
+        for index, (_, column_type) in enumerate(columns):
+            block = zlib.compress(encode_column([row[index] for row in batch], column_type))
+            file.write(struct.pack("<I", len(block)) + block)
+        count += len(batch)
+    file.write(struct.pack("<I", 0))
+    return count
+
+def read_columnar(file):
+    # Returns (header, rows) where rows yields tuples one row group at a time
+    if file.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+        raise ValueError("Not a columnar export file")
+    header = json.loads(file.read(struct.unpack("<I", file.read(4))[0]))
+    column_types = [column_type for _, column_type in header["columns"]]
+
+    def rows():
+        while True:
+            count = struct.unpack("<I", file.read(4))[0]
+            if count == 0:
+                return
+            values = []
+            for column_type in column_types:
+                block = zlib.decompress(file.read(struct.unpack("<I", file.read(4))[0]))
+                values.append(decode_column(block, column_type, count))
+            yield from zip(*values)
+    return header, rows()
+
+def export_to_file(cursor, name, path, export_format, start_date, end_date, employee_ids=None, contribution_percentage=0, selected_year=None):
+    # Writes one export to path ("-" is stdout for CSV) and returns the number of rows
+    columns, batches = export_batches(cursor, name, start_date, end_date, employee_ids, contribution_percentage, selected_year)
+    if export_format == "columnar":
+        with open(path, "wb") as file:
+            return write_columnar(file, columns, batches, name)
+    if path == "-":
+        return write_csv(sys.stdout, columns, batches)
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        return write_csv(file, columns, batches)
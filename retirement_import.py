@@ -0,0 +1,157 @@
+import csv
+from datetime import datetime
+from retirement_money import cents_from_amount
+
+# Bulk income import from payroll CSV/TSV exports. Rows are validated and mapped to
+# employees as the file is read, then inserted in chunks, each chunk in its own
+# transaction, so memory stays flat however long the file is.
+
+INCOME_TYPES = ("Salary", "Bonus")
+EMPLOYEE_COLUMNS = ("employee_id", "employee", "name")
+DATE_FORMATS = ("%m-%d-%Y", "%m%d%Y", "%Y-%m-%d", "%m/%d/%Y")
+REJECTS_HEADER = ["line", "reason", "row"]
+
+def open_income_file(path):
+    # Returns (file, csv reader); tab-separated when the header line contains a tab
+    file = open(path, newline="", encoding="utf-8-sig")
+    header = file.readline()
+    file.seek(0)
+    return file, csv.reader(file, delimiter="\t" if "\t" in header else ",")
+
+def find_columns(header):
+    names = [name.strip().lower().replace(" ", "_") for name in header]
+    employee = next((names.index(name) for name in EMPLOYEE_COLUMNS if name in names), None)
+    missing = [name for name in ("amount", "date", "type") if name not in names]
+    if employee is None:
+        missing.insert(0, "employee_id or name")
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+    return employee, names.index("amount"), names.index("date"), names.index("type")
+
+class EmployeeMatcher:
+    # Maps an id or a (case-insensitive) name to an employee_id; names shared by more
+    # than one employee are rejected rather than guessed
+    def __init__(self, cursor):
+        cursor.execute("SELECT employee_id, name FROM employees")
+        self.ids = set()
+        self.names = {}
+        for employee_id, name in cursor.fetchall():
+            self.ids.add(employee_id)
+            key = name.strip().lower()
+            self.names[key] = None if key in self.names else employee_id
+
+    def match(self, value):
+        # Also accepts the "id: name" labels used by the comboboxes
+        value = value.strip()
+        prefix, separator, _ = value.partition(":")
+        candidate = prefix.strip() if separator else value
+        if candidate.isdigit():
+            if int(candidate) in self.ids:
+                return int(candidate)
+            raise ValueError(f"Unknown employee id {candidate}")
+        key = value.lower()
+        if key not in self.names:
+            raise ValueError(f"Unknown employee {value!r}")
+        if self.names[key] is None:
+            raise ValueError(f"More than one employee is named {value!r}; use the id")
+        return self.names[key]
+
+def parse_amount(value):
+    # Returns the amount in cents
+    amount = cents_from_amount(value)
+    if not amount > 0:
+        raise ValueError("Amount must be positive")
+    return amount
+
+def parse_date(value):
+    # Returns the day number stored in income.date
+    value = value.strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).toordinal()
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid date {value!r} (use MM-DD-YYYY)")
+
+def parse_type(value):
+    for income_type in INCOME_TYPES:
+        if value.strip().lower() == income_type.lower():
+            return income_type
+    raise ValueError(f"Invalid type {value!r} (use {' or '.join(INCOME_TYPES)})")
+
+def import_income(conn, reader, on_reject=None, chunk_size=5000, work=None):
+    # Reads a header row and then income rows from reader. Valid rows are inserted with
+    # executemany and committed every chunk_size rows; on_reject(line, reason, row) is
+    # called for each invalid row. Returns (imported, rejected). With work, a UnitOfWork,
+    # chunks are inserted through it instead and committed with it, so the whole file is
+    # one transaction and one undo step.
+    cursor = conn.cursor()
+    header = next(reader, None)
+    if header is None:
+        raise ValueError("The file is empty")
+    employee_col, amount_col, date_col, type_col = find_columns(header)
+    width = max(employee_col, amount_col, date_col, type_col) + 1
+    matcher = EmployeeMatcher(cursor)
+    imported = rejected = 0
+    chunk = []
+
+    def flush():
+        if work is not None:
+            work.insert_many("income", ("employee_id", "amount", "date", "type"), chunk)
+            chunk.clear()
+            return
+        try:
+            cursor.executemany("INSERT INTO income (employee_id, amount, date, type) VALUES (?, ?, ?, ?)", chunk)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        chunk.clear()
+
+    for row in reader:
+        if not any(field.strip() for field in row):
+            continue
+        try:
+            if len(row) < width:
+                raise ValueError("Too few columns")
+            chunk.append((
+                matcher.match(row[employee_col]),
+                parse_amount(row[amount_col]),
+                parse_date(row[date_col]),
+                parse_type(row[type_col]),
+            ))
+        except ValueError as e:
+            rejected += 1
+            if on_reject:
+                on_reject(reader.line_num, str(e), row)
+            continue
+        if len(chunk) >= chunk_size:
+            imported += len(chunk)
+            flush()
+    if chunk:
+        imported += len(chunk)
+        flush()
+    return imported, rejected
+
+def import_income_file(conn, path, rejects_path=None, chunk_size=5000, work=None):
+    # Imports path and, when rows are rejected and rejects_path is given, writes them there
+    # as CSV (line, reason, original row). Returns (imported, rejected).
+    rejects_file = rejects_writer = None
+
+    def on_reject(line, reason, row):
+        nonlocal rejects_file, rejects_writer
+        if rejects_path is None:
+            return
+        if rejects_writer is None:
+            rejects_file = open(rejects_path, "w", newline="", encoding="utf-8")
+            rejects_writer = csv.writer(rejects_file)
+            rejects_writer.writerow(REJECTS_HEADER)
+        rejects_writer.writerow([line, reason, *row])
+
+    file, reader = open_income_file(path)
+    try:
+        return import_income(conn, reader, on_reject, chunk_size, work)
+    finally:
+        file.close()
+        if rejects_file:
+            rejects_file.close()
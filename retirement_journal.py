@@ -0,0 +1,222 @@
+import json
+from datetime import datetime
+
+# Grouped writes with an undo/redo journal. A UnitOfWork runs one user action (which may
+# touch many rows) in a single transaction and records the before and after image of each
+# row it changes in undo_journal, so the whole batch can later be undone or redone.
+
+TABLE_KEYS = {
+    "employees": "employee_id",
+    "income": "income_id",
+    "notes": "note_id",
+    "attendance": "attendance_id",
+    "taxable_income": "year",
+}
+# Tables whose rows are removed by ON DELETE CASCADE when their parent is deleted
+CASCADE_CHILDREN = {
+    "employees": ("income", "notes", "attendance"),
+}
+JOURNAL_LIMIT = 200  # most recent batches kept for undo
+
+class UndoConflict(Exception):
+    # Raised, with the step rolled back, when undo or redo would delete rows it never recorded
+    pass
+
+def fetch_row(cursor, table, row_id):
+    cursor.execute(f"SELECT * FROM {table} WHERE {TABLE_KEYS[table]} = ?", (row_id,))
+    row = cursor.fetchone()
+    return None if row is None else dict(zip([column[0] for column in cursor.description], row))
+
+def write_row(cursor, table, row_id, values):
+    # Puts the row into the given state: deleted when values is None, otherwise inserted or
+    # updated in place. An upsert rather than REPLACE, so update triggers (the income rollup)
+    # see the change as an update.
+    key = TABLE_KEYS[table]
+    if values is None:
+        cursor.execute(f"DELETE FROM {table} WHERE {key} = ?", (row_id,))
+        return
+    columns = list(values)
+    updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != key)
+    cursor.execute(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT ({key}) DO {'UPDATE SET ' + updates if updates else 'NOTHING'}",
+        list(values.values())
+    )
+
+class UnitOfWork:
+    # with UnitOfWork(conn, "Edit income record") as work:
+    #     work.update("income", income_id, {"amount": amount})
+    #     work.insert("notes", {"employee_id": employee_id, "note_text": text, "date": date})
+    # Commits once on success and rolls everything back if the block raises.
+    def __init__(self, conn, description):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.description = description
+        # (table_name, row_id, old_values, new_values); for rows added by insert_many, row_id
+        # is the range of new keys and new_values the column names, read back at commit
+        self.entries = []
+
+    def __enter__(self):
+        self.cursor.execute("BEGIN IMMEDIATE")
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None:
+            self.conn.rollback()
+            return False
+        try:
+            if self.entries:
+                self.record_batch()
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return False
+
+    def record_batch(self):
+        # A new action discards anything that could still be redone
+        self.cursor.execute("DELETE FROM undo_journal WHERE batch_id IN (SELECT batch_id FROM undo_batches WHERE undone = 1)")
+        self.cursor.execute("DELETE FROM undo_batches WHERE undone = 1")
+        self.cursor.execute(
+            "INSERT INTO undo_batches (description, created) VALUES (?, ?)",
+            (self.description, datetime.now().isoformat(timespec="seconds"))
+        )
+        batch_id = self.cursor.lastrowid
+        rows = []
+        for table, row_id, old, new in self.entries:
+            if not isinstance(row_id, range):
+                rows.append((batch_id, table, row_id, old, new))
+                continue
+            # Keep entry order: write the rows so far, then journal the range in SQL
+            self.write_journal_rows(rows)
+            rows = []
+            key = TABLE_KEYS[table]
+            pairs = ", ".join(f"'{column}', {column}" for column in (key, *new))
+            self.cursor.execute(
+                f"INSERT INTO undo_journal (batch_id, table_name, row_id, old_values, new_values) "
+                f"SELECT ?, ?, {key}, NULL, json_object({pairs}) FROM {table} WHERE {key} BETWEEN ? AND ? ORDER BY {key}",
+                (batch_id, table, row_id.start, row_id.stop - 1)
+            )
+        self.write_journal_rows(rows)
+        oldest_kept = batch_id - JOURNAL_LIMIT
+        self.cursor.execute("DELETE FROM undo_journal WHERE batch_id <= ?", (oldest_kept,))
+        self.cursor.execute("DELETE FROM undo_batches WHERE batch_id <= ?", (oldest_kept,))
+
+    def write_journal_rows(self, rows):
+        self.cursor.executemany(
+            "INSERT INTO undo_journal (batch_id, table_name, row_id, old_values, new_values) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+
+    def insert(self, table, values):
+        columns = list(values)
+        self.cursor.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            list(values.values())
+        )
+        key = TABLE_KEYS[table]
+        row_id = values.get(key, self.cursor.lastrowid)
+        self.entries.append((table, row_id, None, json.dumps({key: row_id, **values})))
+        return row_id
+
+    def insert_many(self, table, columns, rows):
+        # Bulk insert with executemany. The new rows are journaled by key range when the
+        # batch is recorded, instead of one JSON image per row here; keys are assigned
+        # above the current maximum, and BEGIN IMMEDIATE keeps other writers out meanwhile.
+        key = TABLE_KEYS[table]
+        self.cursor.execute(f"SELECT COALESCE(MAX({key}), 0) FROM {table}")
+        first = self.cursor.fetchone()[0] + 1
+        self.cursor.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows
+        )
+        self.cursor.execute(f"SELECT COALESCE(MAX({key}), 0) FROM {table}")
+        last = self.cursor.fetchone()[0]
+        if last >= first:
+            self.entries.append((table, range(first, last + 1), None, tuple(columns)))
+        return max(last - first + 1, 0)
+
+    def update(self, table, row_id, values):
+        old = fetch_row(self.cursor, table, row_id)
+        if old is None:
+            return False
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        self.cursor.execute(f"UPDATE {table} SET {assignments} WHERE {TABLE_KEYS[table]} = ?", [*values.values(), row_id])
+        self.entries.append((table, row_id, json.dumps(old), json.dumps({**old, **values})))
+        return True
+
+    def journal_deleted_rows(self, table, where, params):
+        key = TABLE_KEYS[table]
+        self.cursor.execute(f"SELECT * FROM {table} WHERE {where}", params)
+        columns = [column[0] for column in self.cursor.description]
+        rows = [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+        self.entries.extend((table, row[key], json.dumps(row), None) for row in rows)
+        return len(rows)
+
+    def delete(self, table, where, params=()):
+        # Deletes every row matching where and returns how many were removed. Rows the
+        # database cascades to are journaled first, so undo restores the parent before them.
+        key = TABLE_KEYS[table]
+        for child in CASCADE_CHILDREN.get(table, ()):
+            self.journal_deleted_rows(child, f"{key} IN (SELECT {key} FROM {table} WHERE {where})", params)
+        count = self.journal_deleted_rows(table, where, params)
+        self.cursor.execute(f"DELETE FROM {table} WHERE {where}", params)
+        return count
+
+def find_unjournaled_children(cursor, table, row_id, journaled):
+    # {child table: row count} for rows that deleting this row would cascade to but that
+    # are not in journaled, a set of (table, row_id); such rows could never be brought back
+    key = TABLE_KEYS[table]
+    missing = {}
+    for child in CASCADE_CHILDREN.get(table, ()):
+        cursor.execute(f"SELECT {TABLE_KEYS[child]} FROM {child} WHERE {key} = ?", (row_id,))
+        count = sum(1 for (child_id,) in cursor.fetchall() if (child, child_id) not in journaled)
+        if count:
+            missing[child] = count
+    return missing
+
+def step_batch(conn, undo):
+    # Undoes the newest live batch or redoes the oldest undone one, in one transaction.
+    # Returns the batch description, or None if there was nothing to do.
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.execute(
+            "SELECT batch_id, description FROM undo_batches WHERE undone = ? ORDER BY batch_id "
+            + ("DESC" if undo else "ASC") + " LIMIT 1",
+            (0 if undo else 1,)
+        )
+        batch = cursor.fetchone()
+        if batch is None:
+            conn.rollback()
+            return None
+        batch_id, description = batch
+        cursor.execute(
+            "SELECT table_name, row_id, old_values, new_values FROM undo_journal WHERE batch_id = ? ORDER BY entry_id "
+            + ("DESC" if undo else "ASC"),
+            (batch_id,)
+        )
+        entries = cursor.fetchall()
+        journaled = {(table, row_id) for table, row_id, _, _ in entries}
+        for table, row_id, old_values, new_values in entries:
+            state = old_values if undo else new_values
+            if state is None:
+                missing = find_unjournaled_children(cursor, table, row_id, journaled)
+                if missing:
+                    records = ", ".join(f"{count} {child} records" for child, count in missing.items())
+                    raise UndoConflict(
+                        f"{'Undoing' if undo else 'Redoing'} \"{description}\" would also delete {records} "
+                        "added outside it. Undo or delete those first."
+                    )
+            write_row(cursor, table, row_id, None if state is None else json.loads(state))
+        cursor.execute("UPDATE undo_batches SET undone = ? WHERE batch_id = ?", (1 if undo else 0, batch_id))
+        conn.commit()
+        return description
+    except Exception:
+        conn.rollback()
+        raise
+
+def undo_batch(conn):
+    return step_batch(conn, True)
+
+def redo_batch(conn):
+    return step_batch(conn, False)
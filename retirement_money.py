@@ -0,0 +1,62 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# Money is stored and added up as integer cents (income.amount, taxable_income.total_profit
+# and the rollup totals), so sums are exact and equal figures compare equal. Contributions
+# are worked out in fixed point from the percentage in basis points (5.25% is 525).
+
+CENT = Decimal("0.01")
+
+def cents_from_amount(value):
+    # "1,234.56", "$80", 1234.5 -> cents, rounding half a cent up; raises ValueError
+    text = str(value).strip().replace("$", "").replace(",", "")
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount {value!r}") from None
+    if not amount.is_finite():
+        raise ValueError(f"Invalid amount {value!r}")
+    return int(amount.quantize(CENT, rounding=ROUND_HALF_UP) * 100)
+
+def format_cents(cents):
+    # Plain decimal text such as "-1234.50", for entries and CSV output
+    sign = "-" if cents < 0 else ""
+    whole, part = divmod(abs(cents), 100)
+    return f"{sign}{whole}.{part:02d}"
+
+def format_cents_grouped(cents):
+    # Like format_cents with thousands separators, e.g. "1,234.50"
+    whole, part = divmod(abs(cents), 100)
+    return f"{'-' if cents < 0 else ''}{whole:,}.{part:02d}"
+
+def parse_percentage(value):
+    # "5.25" -> 5.25; raises ValueError for anything basis_points could not hold exactly,
+    # i.e. negative or with more than two decimals
+    try:
+        percentage = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"Invalid percentage {value!r}") from None
+    if not percentage.is_finite() or percentage < 0:
+        raise ValueError(f"Invalid percentage {value!r}")
+    if percentage != percentage.quantize(CENT):
+        raise ValueError(f"Percentage {value} has more than two decimals")
+    return float(percentage)
+
+def basis_points(percentage):
+    # Contribution percentage as an integer number of hundredths of a percent. New values
+    # go through parse_percentage; older settings with more decimals are rounded here.
+    return int(Decimal(str(percentage)).quantize(CENT, rounding=ROUND_HALF_UP) * 100)
+
+def apply_basis_points(cents, points):
+    # cents * points / 10000, rounded half away from zero
+    product = cents * points
+    quotient = (abs(product) + 5000) // 10000
+    return quotient if product >= 0 else -quotient
+
+def remove_basis_points(cents, points):
+    # The amount whose share at points is cents (the inverse of apply_basis_points), for
+    # non-negative cents and positive points, rounded half up
+    return (cents * 20000 + points) // (points * 2)
+
+def sql_cents(column):
+    # SQL expression converting a REAL amount column to cents
+    return f"CAST(ROUND({column} * 100) AS INTEGER)"
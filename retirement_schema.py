@@ -0,0 +1,352 @@
+from datetime import datetime
+from retirement_dates import sql_iso_date, sql_day_from_iso
+from retirement_money import sql_cents
+
+# Schema migrations for retirement.db. PRAGMA user_version holds the number of
+# steps already applied, so an up-to-date database is opened without any DDL.
+
+def create_base_schema(cursor):
+    # Create tables if they don't exist
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS employees (
+            employee_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            department TEXT,
+            eligible_for_retirement INTEGER DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS income (
+            income_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            employee_id INTEGER,
+            amount REAL,
+            date TEXT,
+            type TEXT,
+            FOREIGN KEY (employee_id) REFERENCES employees(employee_id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS taxable_income (
+            year INTEGER PRIMARY KEY,
+            total_profit REAL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS settings (
+            setting_id INTEGER PRIMARY KEY,
+            contribution_percentage REAL,
+            selected_year INTEGER,
+            fiscal_year_start TEXT,
+            fiscal_year_end TEXT,
+            privacy_mode INTEGER
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS notes (
+            note_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            employee_id INTEGER,
+            note_text TEXT,
+            date TEXT,
+            FOREIGN KEY (employee_id) REFERENCES employees(employee_id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS attendance (
+            attendance_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            employee_id INTEGER,
+            date TEXT,
+            status TEXT,  -- 'Absent' or 'Tardy'
+            FOREIGN KEY (employee_id) REFERENCES employees(employee_id)
+        )
+    """)
+    # Databases created by older versions of the tracker may lack these columns
+    cursor.execute("PRAGMA table_info(employees)")
+    columns = [col[1] for col in cursor.fetchall()]
+    if 'eligible_for_retirement' not in columns:
+        cursor.execute("ALTER TABLE employees ADD COLUMN eligible_for_retirement INTEGER DEFAULT 0")
+    cursor.execute("PRAGMA table_info(settings)")
+    columns = [col[1] for col in cursor.fetchall()]
+    if 'selected_year' not in columns:
+        cursor.execute("ALTER TABLE settings ADD COLUMN selected_year INTEGER")
+        cursor.execute("UPDATE settings SET selected_year = ? WHERE setting_id = 1", (datetime.now().year,))
+    if 'privacy_mode' not in columns:
+        cursor.execute("ALTER TABLE settings ADD COLUMN privacy_mode INTEGER")
+        cursor.execute("UPDATE settings SET privacy_mode = 0 WHERE setting_id = 1")
+    # Insert default settings if not present
+    cursor.execute("SELECT COUNT(*) FROM settings")
+    if cursor.fetchone()[0] == 0:
+        default_year = datetime.now().year
+        cursor.execute(
+            "INSERT INTO settings (setting_id, contribution_percentage, selected_year, fiscal_year_start, fiscal_year_end, privacy_mode) VALUES (?, ?, ?, ?, ?, ?)",
+            (1, 5.0, default_year, f"{default_year}-03-01", f"{default_year + 1}-02-28", 0)
+        )
+    # Remove the old deductions table
+    cursor.execute("DROP TABLE IF EXISTS deductions")
+    # Secondary indexes for the summary, compare and notes queries
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_income_employee_date ON income (employee_id, date, amount)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_attendance_employee_status_date ON attendance (employee_id, status, date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_notes_employee_date ON notes (employee_id, date)")
+
+# Fiscal years run March 1 to the end of February, named by the year they start in.
+# Dates were ISO text up to schema step 4 and are day numbers from step 5 on.
+TEXT_FISCAL_YEAR_SQL = "(CAST(substr({date}, 1, 4) AS INTEGER) - (substr({date}, 6, 2) < '03'))"
+FISCAL_YEAR_SQL = TEXT_FISCAL_YEAR_SQL.format(date=sql_iso_date("{date}"))
+
+def create_income_rollup(cursor):
+    # Per-employee, per-fiscal-year income totals kept current by triggers on income
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS income_rollup (
+            employee_id INTEGER NOT NULL,
+            fiscal_year INTEGER NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (employee_id, fiscal_year)
+        ) WITHOUT ROWID
+    """)
+    create_income_rollup_triggers(cursor, TEXT_FISCAL_YEAR_SQL)
+    rebuild_income_rollup(cursor, TEXT_FISCAL_YEAR_SQL)
+
+def create_income_rollup_triggers(cursor, fiscal_year_sql=FISCAL_YEAR_SQL):
+    new_year = fiscal_year_sql.format(date="NEW.date")
+    old_year = fiscal_year_sql.format(date="OLD.date")
+    add_new = f"""
+            INSERT INTO income_rollup (employee_id, fiscal_year, total, count)
+            VALUES (NEW.employee_id, {new_year}, NEW.amount, 1)
+            ON CONFLICT (employee_id, fiscal_year) DO UPDATE SET total = total + excluded.total, count = count + 1;"""
+    remove_old = f"""
+            UPDATE income_rollup SET total = total - OLD.amount, count = count - 1
+            WHERE employee_id = OLD.employee_id AND fiscal_year = {old_year};
+            DELETE FROM income_rollup
+            WHERE employee_id = OLD.employee_id AND fiscal_year = {old_year} AND count <= 0;"""
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS income_rollup_insert AFTER INSERT ON income
+        WHEN NEW.employee_id IS NOT NULL AND NEW.date IS NOT NULL
+        BEGIN{add_new}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS income_rollup_delete AFTER DELETE ON income
+        WHEN OLD.employee_id IS NOT NULL AND OLD.date IS NOT NULL
+        BEGIN{remove_old}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS income_rollup_update_old AFTER UPDATE OF employee_id, amount, date ON income
+        WHEN OLD.employee_id IS NOT NULL AND OLD.date IS NOT NULL
+        BEGIN{remove_old}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS income_rollup_update_new AFTER UPDATE OF employee_id, amount, date ON income
+        WHEN NEW.employee_id IS NOT NULL AND NEW.date IS NOT NULL
+        BEGIN{add_new}
+        END
+    """)
+
+def rebuild_income_rollup(cursor, fiscal_year_sql=FISCAL_YEAR_SQL):
+    cursor.execute("DELETE FROM income_rollup")
+    cursor.execute(f"""
+        INSERT INTO income_rollup (employee_id, fiscal_year, total, count)
+        SELECT employee_id, {fiscal_year_sql.format(date="date")}, SUM(amount), COUNT(*)
+        FROM income
+        WHERE employee_id IS NOT NULL AND date IS NOT NULL
+        GROUP BY 1, 2
+    """)
+
+def find_income_rollup_mismatches(cursor, tolerance=0):
+    # Returns (employee_id, fiscal_year, rollup_total, rollup_count, actual_total, actual_count)
+    # for every rollup row that disagrees with the income table
+    cursor.execute(f"""
+        WITH actual AS (
+            SELECT employee_id, {FISCAL_YEAR_SQL.format(date="date")} AS fiscal_year, SUM(amount) AS total, COUNT(*) AS count
+            FROM income
+            WHERE employee_id IS NOT NULL AND date IS NOT NULL
+            GROUP BY 1, 2
+        ),
+        keys AS (
+            SELECT employee_id, fiscal_year FROM actual
+            UNION
+            SELECT employee_id, fiscal_year FROM income_rollup
+        )
+        SELECT k.employee_id, k.fiscal_year, r.total, r.count, a.total, a.count
+        FROM keys k
+        LEFT JOIN income_rollup r ON r.employee_id = k.employee_id AND r.fiscal_year = k.fiscal_year
+        LEFT JOIN actual a ON a.employee_id = k.employee_id AND a.fiscal_year = k.fiscal_year
+        WHERE r.count IS NOT a.count OR ABS(COALESCE(r.total, 0) - COALESCE(a.total, 0)) > ?
+        ORDER BY k.employee_id, k.fiscal_year
+    """, (tolerance,))
+    return cursor.fetchall()
+
+def create_undo_journal(cursor):
+    # One undo_batches row per user action; undo_journal holds the before/after image of
+    # every row it changed, as JSON objects (NULL before an insert or after a delete)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS undo_batches (
+            batch_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            description TEXT NOT NULL,
+            created TEXT NOT NULL,
+            undone INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS undo_journal (
+            entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            batch_id INTEGER NOT NULL REFERENCES undo_batches(batch_id),
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            old_values TEXT,
+            new_values TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_undo_journal_batch ON undo_journal (batch_id, entry_id)")
+
+# Child tables of employees as rebuilt with ON DELETE CASCADE: (key, definition, columns).
+# Column types that changed in later steps are filled in from one of the type sets below.
+EMPLOYEE_CHILD_TABLES = {
+    "income": ("income_id", """
+        income_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER REFERENCES employees(employee_id) ON DELETE CASCADE,
+        amount {amount_type},
+        date {date_type},
+        type TEXT
+    """, ("income_id", "employee_id", "amount", "date", "type")),
+    "notes": ("note_id", """
+        note_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER REFERENCES employees(employee_id) ON DELETE CASCADE,
+        note_text TEXT,
+        date {date_type}
+    """, ("note_id", "employee_id", "note_text", "date")),
+    "attendance": ("attendance_id", """
+        attendance_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER REFERENCES employees(employee_id) ON DELETE CASCADE,
+        date {date_type},
+        status TEXT
+    """, ("attendance_id", "employee_id", "date", "status")),
+}
+TEXT_DATE_TYPES = {"date_type": "TEXT", "amount_type": "REAL"}  # step 4
+DAY_NUMBER_TYPES = {"date_type": "INTEGER", "amount_type": "REAL"}  # step 5
+CENTS_TYPES = {"date_type": "INTEGER", "amount_type": "INTEGER"}  # step 6
+
+def rebuild_employee_child_table(cursor, table, column_types, expressions=None):
+    # Recreates table from EMPLOYEE_CHILD_TABLES, copying rows whose employee still exists.
+    # expressions maps a column to the SQL that converts its old value.
+    key, definition, columns = EMPLOYEE_CHILD_TABLES[table]
+    expressions = expressions or {}
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+    sequence = cursor.fetchone()
+    column_list = ", ".join(columns)
+    select_list = ", ".join(expressions.get(column, column) for column in columns)
+    cursor.execute(f"CREATE TABLE {table}_new ({definition.format(**column_types)})")
+    cursor.execute(f"""
+        INSERT INTO {table}_new ({column_list})
+        SELECT {select_list} FROM {table}
+        WHERE employee_id IS NULL OR employee_id IN (SELECT employee_id FROM employees)
+        ORDER BY {key}
+    """)
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    # Keep AUTOINCREMENT from reusing ids that were handed out before the rebuild
+    if sequence is not None:
+        cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (sequence[0], table))
+
+def create_employee_child_indexes(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_income_employee_date ON income (employee_id, date, amount)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_attendance_employee_status_date ON attendance (employee_id, status, date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_notes_employee_date ON notes (employee_id, date)")
+
+def cascade_employee_deletes(cursor):
+    # SQLite cannot alter a foreign key, so each child table is rebuilt with ON DELETE
+    # CASCADE. Rows whose employee no longer exists were never shown anywhere and are
+    # dropped, since they would fail the now-enforced constraint. Indexes and the income
+    # rollup triggers go with the old tables and are recreated.
+    for table in EMPLOYEE_CHILD_TABLES:
+        rebuild_employee_child_table(cursor, table, TEXT_DATE_TYPES)
+    create_employee_child_indexes(cursor)
+    create_income_rollup_triggers(cursor, TEXT_FISCAL_YEAR_SQL)
+    rebuild_income_rollup(cursor, TEXT_FISCAL_YEAR_SQL)
+
+def create_iso_date_views(cursor):
+    # The child tables with their dates as ISO text, for ad-hoc queries and other tools
+    for table, (_, _, columns) in EMPLOYEE_CHILD_TABLES.items():
+        select_list = ", ".join(f"{sql_iso_date('date')} AS date" if column == "date" else column for column in columns)
+        cursor.execute(f"CREATE VIEW IF NOT EXISTS {table}_iso AS SELECT {select_list} FROM {table}")
+
+def convert_journal_values(cursor, table, column, expression):
+    # Applies expression (written against {value}) to column in the journaled row images of table
+    for image in ("old_values", "new_values"):
+        value = f"json_extract({image}, '$.{column}')"
+        cursor.execute(f"""
+            UPDATE undo_journal
+            SET {image} = json_set({image}, '$.{column}', {expression.format(value=value)})
+            WHERE table_name = ? AND {image} IS NOT NULL AND json_type({image}, '$.{column}') IN ('text', 'real', 'integer')
+        """, (table,))
+
+def store_dates_as_day_numbers(cursor):
+    # ISO text dates become integer day numbers (see retirement_dates); anything that is
+    # not a valid date becomes NULL. Journaled row images are converted too, so undo keeps
+    # working across the upgrade.
+    for table in EMPLOYEE_CHILD_TABLES:
+        rebuild_employee_child_table(cursor, table, DAY_NUMBER_TYPES, {"date": sql_day_from_iso("date")})
+        convert_journal_values(cursor, table, "date", sql_day_from_iso("{value}"))
+    create_iso_date_views(cursor)
+    create_employee_child_indexes(cursor)
+    create_income_rollup_triggers(cursor)
+    rebuild_income_rollup(cursor)
+
+def store_amounts_as_cents(cursor):
+    # Income amounts, taxable profit and the rollup totals become integer cents (see
+    # retirement_money). Columns with REAL affinity would turn integers back into floats,
+    # so each table is rebuilt; the view on income has to go first or the rename fails.
+    cursor.execute("DROP VIEW IF EXISTS income_iso")
+    rebuild_employee_child_table(cursor, "income", CENTS_TYPES, {"amount": sql_cents("amount")})
+    convert_journal_values(cursor, "income", "amount", sql_cents("{value}"))
+    cursor.execute("CREATE TABLE taxable_income_new (year INTEGER PRIMARY KEY, total_profit INTEGER)")
+    cursor.execute(f"INSERT INTO taxable_income_new (year, total_profit) SELECT year, {sql_cents('total_profit')} FROM taxable_income")
+    cursor.execute("DROP TABLE taxable_income")
+    cursor.execute("ALTER TABLE taxable_income_new RENAME TO taxable_income")
+    convert_journal_values(cursor, "taxable_income", "total_profit", sql_cents("{value}"))
+    cursor.execute("DROP TABLE income_rollup")
+    cursor.execute("""
+        CREATE TABLE income_rollup (
+            employee_id INTEGER NOT NULL,
+            fiscal_year INTEGER NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (employee_id, fiscal_year)
+        ) WITHOUT ROWID
+    """)
+    create_iso_date_views(cursor)
+    create_employee_child_indexes(cursor)
+    create_income_rollup_triggers(cursor)
+    rebuild_income_rollup(cursor)
+
+# Append new steps to the end; never edit or reorder a step that has shipped.
+MIGRATIONS = [
+    create_base_schema,  # 1
+    create_income_rollup,  # 2
+    create_undo_journal,  # 3
+    cascade_employee_deletes,  # 4
+    store_dates_as_day_numbers,  # 5
+    store_amounts_as_cents,  # 6
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    version = get_schema_version(conn)
+    if version >= SCHEMA_VERSION:
+        return version
+    # Run every pending step in one transaction so a failure leaves the old schema intact
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        for step in MIGRATIONS[version:]:
+            step(cursor)
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return SCHEMA_VERSION
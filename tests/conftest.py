@@ -0,0 +1,21 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The tracker is a set of flat modules in the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+def pytest_addoption(parser):
+    parser.addoption("--run-benchmarks", action="store_true", help="also run tests marked benchmark")
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: slow test on a large generated database, skipped unless --run-benchmarks is given")
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-benchmarks"):
+        return
+    skip = pytest.mark.skip(reason="benchmark; run with --run-benchmarks")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
@@ -0,0 +1,41 @@
+import io
+
+import pytest
+
+from retirement_dates import day_from_iso
+from retirement_engine import open_database
+from retirement_export import export_batches, read_columnar, write_columnar, write_csv
+
+@pytest.fixture
+def cursor(tmp_path):
+    conn = open_database(str(tmp_path / "retirement.db"))
+    conn.execute("INSERT INTO employees (employee_id, name, department, eligible_for_retirement) VALUES (1, 'Ann Lee', 'Shop', 1)")
+    conn.executemany(
+        "INSERT INTO income (employee_id, amount, date, type) VALUES (1, ?, ?, 'Salary')",
+        [(120050, day_from_iso("2024-01-05")), (10000, day_from_iso("2024-01-06")), (-1, day_from_iso("2024-01-07"))],
+    )
+    conn.commit()
+    yield conn.cursor()
+    conn.close()
+
+def export_csv(cursor, name):
+    file = io.StringIO()
+    write_csv(file, *export_batches(cursor, name, "2024-01-01", "2024-12-31", contribution_percentage=5.25))
+    return file.getvalue().splitlines()
+
+def test_csv_money_is_exact_decimal_text(cursor):
+    assert export_csv(cursor, "income")[1:] == [
+        "1,1,1200.50,2024-01-05,Salary",
+        "2,1,100.00,2024-01-06,Salary",
+        "3,1,-0.01,2024-01-07,Salary",
+    ]
+    # 130049 cents at 5.25% is 6827.57 cents, rounded half away from zero
+    assert export_csv(cursor, "summary")[1:] == ["1,Ann Lee,Shop,1300.49,68.28,1"]
+
+def test_columnar_money_is_integer_cents(cursor):
+    file = io.BytesIO()
+    write_columnar(file, *export_batches(cursor, "income", "2024-01-01", "2024-12-31"), "income")
+    file.seek(0)
+    header, rows = read_columnar(file)
+    assert ["amount_cents", "int"] in header["columns"]
+    assert [row[2] for row in rows] == [120050, 10000, -1]
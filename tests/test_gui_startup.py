@@ -0,0 +1,51 @@
+import random
+import time
+
+import pytest
+
+from retirement_dates import day_from_iso
+from retirement_engine import open_database
+
+# Time to first paint of the tracker on a large database. Only the first tab is built at
+# startup; the others are built when first selected.
+STARTUP_LIMIT = 2.0  # seconds; generous, it is well under a second on a laptop
+
+def make_large_database(path, employees=2000, income_rows=400_000):
+    conn = open_database(path)
+    rng = random.Random(2)
+    first, last = day_from_iso("2021-01-01"), day_from_iso("2025-12-31")
+    conn.executemany(
+        "INSERT INTO employees (employee_id, name, department, eligible_for_retirement) VALUES (?, ?, 'Shop', ?)",
+        [(i, f"Employee {i}", i % 2) for i in range(1, employees + 1)],
+    )
+    conn.executemany(
+        "INSERT INTO income (employee_id, amount, date, type) VALUES (?, ?, ?, 'Salary')",
+        ((rng.randrange(1, employees + 1), rng.randrange(1, 500000), rng.randint(first, last)) for _ in range(income_rows)),
+    )
+    conn.commit()
+    conn.close()
+
+@pytest.mark.benchmark
+def test_startup_builds_only_the_first_tab(tmp_path, monkeypatch):
+    tk = pytest.importorskip("tkinter")
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display")
+    import active_2
+
+    path = str(tmp_path / "retirement.db")
+    make_large_database(path)
+    monkeypatch.setattr(active_2, "DATABASE_PATH", path)
+    try:
+        started = time.perf_counter()
+        app = active_2.RetirementTrackerApp(root)
+        root.update()
+        startup = time.perf_counter() - started
+
+        tabs = app.notebook.tabs()
+        assert [tab for tab in tabs if app.is_tab_built(tab)] == tabs[:1]
+        assert startup < STARTUP_LIMIT, f"first paint took {startup:.2f} s"
+        app.db_worker.close()
+    finally:
+        root.destroy()
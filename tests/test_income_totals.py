@@ -0,0 +1,96 @@
+import random
+import time
+
+import pytest
+
+from retirement_dates import day_from_iso
+from retirement_engine import build_income_totals_query, fetch_employee_totals, fiscal_year_range, open_database
+
+# Fiscal year 2023 runs 2023-03-01 to 2024-02-29, so it ends on a leap day
+YEAR = 2023
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = open_database(str(tmp_path / "retirement.db"))
+    yield conn
+    conn.close()
+
+def add_employees(conn, *names):
+    conn.executemany(
+        "INSERT INTO employees (employee_id, name, department, eligible_for_retirement) VALUES (?, ?, 'Shop', 1)",
+        list(enumerate(names, start=1)),
+    )
+
+def add_income(conn, rows):
+    # rows are (employee_id, cents, ISO date)
+    conn.executemany(
+        "INSERT INTO income (employee_id, amount, date, type) VALUES (?, ?, ?, 'Salary')",
+        [(employee_id, cents, day_from_iso(date)) for employee_id, cents, date in rows],
+    )
+    conn.commit()
+
+def scan_totals(cursor, year, employee_ids=None):
+    # No selected year, so the totals are summed from income rather than read from the rollup
+    return fetch_employee_totals(cursor, *fiscal_year_range(year), None, employee_ids)
+
+def rollup_totals(cursor, year, employee_ids=None):
+    return fetch_employee_totals(cursor, *fiscal_year_range(year), year, employee_ids)
+
+def test_fiscal_year_uses_rollup():
+    query, params = build_income_totals_query(*fiscal_year_range(YEAR), YEAR)
+    assert "income_rollup" in query and params == [YEAR]
+    query, params = build_income_totals_query(*fiscal_year_range(YEAR))
+    assert "income_rollup" not in query
+
+def test_income_outside_range_gives_zero_row(conn):
+    add_employees(conn, "Ann Lee", "Bo Diaz")
+    add_income(conn, [(1, 150000, "2023-06-15"), (2, 99900, "2022-12-01"), (2, 50000, "2024-03-01")])
+    cursor = conn.cursor()
+    expected = [(1, "Ann Lee", "Shop", 150000, 1), (2, "Bo Diaz", "Shop", 0, 1)]
+    assert scan_totals(cursor, YEAR) == expected
+    assert rollup_totals(cursor, YEAR) == expected
+    assert scan_totals(cursor, YEAR, [2]) == expected[1:]
+
+def test_rollup_matches_scan_across_year_boundaries(conn):
+    add_employees(conn, "Ann Lee", "Bo Diaz", "Cy Park")
+    add_income(conn, [
+        (1, 100, "2023-02-28"),  # previous fiscal year
+        (1, 200, "2023-03-01"),
+        (1, 400, "2024-02-29"),
+        (1, 800, "2024-03-01"),  # next fiscal year
+        (2, 1600, "2023-12-31"),
+        (2, 3200, "2024-01-01"),
+        (2, -500, "2024-02-29"),
+    ])
+    cursor = conn.cursor()
+    for year in (YEAR - 1, YEAR, YEAR + 1):
+        assert rollup_totals(cursor, year) == scan_totals(cursor, year)
+    assert [row[3] for row in rollup_totals(cursor, YEAR)] == [600, 4300, 0]
+
+    # Edits go through the rollup triggers
+    conn.execute("UPDATE income SET date = ? WHERE amount = 800", (day_from_iso("2024-02-29"),))
+    conn.execute("DELETE FROM income WHERE amount = 1600")
+    conn.commit()
+    assert rollup_totals(cursor, YEAR) == scan_totals(cursor, YEAR)
+    assert [row[3] for row in rollup_totals(cursor, YEAR)] == [1400, 2700, 0]
+
+@pytest.mark.benchmark
+def test_rollup_matches_scan_on_a_million_rows(conn):
+    employees = 2000
+    add_employees(conn, *(f"Employee {i}" for i in range(employees)))
+    rng = random.Random(4)
+    first, last = day_from_iso("2021-01-01"), day_from_iso("2025-12-31")
+    conn.executemany(
+        "INSERT INTO income (employee_id, amount, date, type) VALUES (?, ?, ?, 'Salary')",
+        ((rng.randrange(1, employees + 1), rng.randrange(1, 500000), rng.randint(first, last)) for _ in range(1_000_000)),
+    )
+    conn.commit()
+    cursor = conn.cursor()
+    started = time.perf_counter()
+    scanned = scan_totals(cursor, YEAR)
+    scan_time = time.perf_counter() - started
+    started = time.perf_counter()
+    rolled_up = rollup_totals(cursor, YEAR)
+    rollup_time = time.perf_counter() - started
+    assert rolled_up == scanned
+    assert rollup_time < scan_time, f"scan {scan_time * 1000:.1f} ms, rollup {rollup_time * 1000:.1f} ms"
@@ -0,0 +1,47 @@
+import csv
+import io
+
+import pytest
+
+from retirement_engine import open_database
+from retirement_import import import_income
+from retirement_journal import UndoConflict, UnitOfWork, redo_batch, undo_batch
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = open_database(str(tmp_path / "retirement.db"))
+    yield conn
+    conn.close()
+
+def income_file(employee_id, count):
+    lines = ["employee_id,amount,date,type"]
+    lines += [f"{employee_id},{100 + i}.25,01-{1 + i % 28:02d}-2024,Salary" for i in range(count)]
+    return csv.reader(io.StringIO("\n".join(lines)))
+
+def income_rows(conn, employee_id):
+    return conn.execute("SELECT * FROM income WHERE employee_id = ? ORDER BY income_id", (employee_id,)).fetchall()
+
+def test_undo_refuses_to_cascade_over_unjournaled_rows(conn):
+    with UnitOfWork(conn, "Add employee") as work:
+        employee_id = work.insert("employees", {"name": "Ann Lee"})
+    import_income(conn, income_file(employee_id, 20))
+    with pytest.raises(UndoConflict, match="20 income records"):
+        undo_batch(conn)
+    assert len(income_rows(conn, employee_id)) == 20
+    assert conn.execute("SELECT COUNT(*) FROM employees").fetchone()[0] == 1
+
+def test_journaled_import_is_one_undo_step(conn):
+    with UnitOfWork(conn, "Add employee") as work:
+        employee_id = work.insert("employees", {"name": "Ann Lee"})
+    with UnitOfWork(conn, "Import income") as work:
+        work.insert("income", {"employee_id": employee_id, "amount": 5, "date": 738000, "type": "Bonus"})
+        assert import_income(conn, income_file(employee_id, 30), chunk_size=7, work=work) == (30, 0)
+    imported = income_rows(conn, employee_id)
+    assert len(imported) == 31
+
+    assert undo_batch(conn) == "Import income"
+    assert income_rows(conn, employee_id) == []
+    assert undo_batch(conn) == "Add employee"
+    assert redo_batch(conn) == "Add employee"
+    assert redo_batch(conn) == "Import income"
+    assert income_rows(conn, employee_id) == imported
@@ -0,0 +1,66 @@
+import random
+import time
+
+import pytest
+
+from retirement_dates import day_from_iso
+from retirement_engine import build_compare_query, build_income_totals_query, open_database
+
+# The per-employee lookups must be index range searches, not table scans. The notes query
+# is the one the Summary notes pane and the notes viewer run.
+NOTES_QUERY = "SELECT date, note_text FROM notes WHERE employee_id = ? ORDER BY date DESC"
+START, END = "2024-01-01", "2024-12-31"
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = open_database(str(tmp_path / "retirement.db"))
+    yield conn
+    conn.close()
+
+def query_plan(conn, query, params):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+
+def assert_searches(plan, table, index):
+    assert any(step.startswith(f"SEARCH {table} USING") and index in step for step in plan), plan
+    assert not any(step.startswith(f"SCAN {table}") for step in plan), plan
+
+def check_plans(conn):
+    assert_searches(query_plan(conn, *build_income_totals_query(START, END)), "i", "COVERING INDEX idx_income_employee_date")
+    compare_plan = query_plan(conn, *build_compare_query(START, END, [1, 2, 3]))
+    assert_searches(compare_plan, "i", "COVERING INDEX idx_income_employee_date")
+    assert_searches(compare_plan, "attendance", "COVERING INDEX idx_attendance_employee_status_date")
+    notes_plan = query_plan(conn, NOTES_QUERY, (1,))
+    assert_searches(notes_plan, "notes", "INDEX idx_notes_employee_date")
+    assert not any("TEMP B-TREE" in step for step in notes_plan), notes_plan
+
+def test_lookups_use_indexes(conn):
+    check_plans(conn)
+
+@pytest.mark.benchmark
+def test_lookups_use_indexes_on_a_large_database(conn):
+    # 2,000 employees, 400k income rows and 100k attendance and notes rows, with statistics
+    employees = 2000
+    rng = random.Random(1)
+    first, last = day_from_iso("2021-01-01"), day_from_iso("2025-12-31")
+    def employee_days(count):
+        return [(rng.randrange(1, employees + 1), rng.randint(first, last)) for _ in range(count)]
+    conn.executemany("INSERT INTO employees (employee_id, name) VALUES (?, ?)", [(i, f"Employee {i}") for i in range(1, employees + 1)])
+    conn.executemany("INSERT INTO income (employee_id, date, amount, type) VALUES (?, ?, 100000, 'Salary')", employee_days(400_000))
+    conn.executemany("INSERT INTO attendance (employee_id, date, status) VALUES (?, ?, 'Absent')", employee_days(100_000))
+    conn.executemany("INSERT INTO notes (employee_id, date, note_text) VALUES (?, ?, 'note')", employee_days(100_000))
+    conn.commit()
+    conn.execute("ANALYZE")
+    check_plans(conn)
+
+    timings = {}
+    for name, (query, params) in {
+        "summary": build_income_totals_query(START, END),
+        "compare": build_compare_query(START, END, [1, 2, 3]),
+        "notes": (NOTES_QUERY, (1,)),
+    }.items():
+        started = time.perf_counter()
+        conn.execute(query, params).fetchall()
+        timings[name] = time.perf_counter() - started
+    # Full scans took over a second for the summary on this data set
+    assert timings["summary"] < 0.5, timings
+    assert timings["compare"] < 0.05 and timings["notes"] < 0.05, timings
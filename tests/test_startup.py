@@ -0,0 +1,48 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The command line must start without tkinter (no display over ssh or cron) and without
+# PyPDF2 (only the PDF import uses it), and the GUI module should stay quick to import.
+GUI_ONLY_MODULES = ("tkinter", "_tkinter", "PyPDF2")
+ACTIVE_IMPORT_LIMIT = 1.0  # seconds; generous, it is about 70 ms on a laptop
+
+def import_times(*args):
+    # {module: cumulative seconds} from python -X importtime
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return result, times
+
+def loaded_gui_modules(times):
+    return [name for name in times if name.split(".")[0] in GUI_ONLY_MODULES]
+
+def test_cli_import_skips_gui_modules():
+    result, times = import_times("-c", "import retirement_cli")
+    assert result.returncode == 0, result.stderr
+    assert "retirement_cli" in times
+    assert loaded_gui_modules(times) == []
+
+def test_subcommand_dispatch_skips_gui_modules():
+    result, times = import_times("active_2.py", "report", "--help")
+    assert result.returncode == 0, result.stderr
+    assert "retirement_cli" in times
+    assert loaded_gui_modules(times) == []
+
+def test_gui_import_time():
+    pytest.importorskip("tkinter")
+    result, times = import_times("-c", "import active_2")
+    assert result.returncode == 0, result.stderr
+    assert "PyPDF2" not in times
+    assert times["active_2"] < ACTIVE_IMPORT_LIMIT